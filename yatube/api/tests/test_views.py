@@ -0,0 +1,184 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, Comment, Follow
+
+User = get_user_model()
+
+
+class ApiViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author,
+                group=cls.group if number % 2 else None
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_posts(self):
+        """Посты отдаются от новых к старым со всеми полями"""
+        response = self.client.get(reverse('api:posts'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [post.pk for post in reversed(self.posts)]
+        )
+        self.assertEqual(data['results'][1], {
+            'id': self.posts[3].pk,
+            'text': 'Пост 3',
+            'pub_date': data['results'][1]['pub_date'],
+            'author': 'author',
+            'group': 'group',
+            'image': None,
+            'image_width': None,
+            'image_height': None,
+        })
+        self.assertIsNone(data['next'])
+        self.assertIsNone(data['previous'])
+
+    def test_fields(self):
+        """fields= оставляет в ответе только запрошенные поля"""
+        response = self.client.get(
+            reverse('api:posts'), {'fields': 'id,author'}
+        )
+        self.assertEqual(response.json()['results'][0], {
+            'id': self.posts[-1].pk, 'author': 'author'
+        })
+
+    def test_unknown_field(self):
+        """Неизвестное поле - ошибка 400 в JSON"""
+        response = self.client.get(reverse('api:posts'), {'fields': 'email'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json()['error'])
+
+    def test_cursor_pages(self):
+        """Страницы по курсору идут без пропусков и повторов"""
+        url = reverse('api:posts')
+        first = self.client.get(url, {'limit': 2, 'fields': 'id'}).json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        third = self.client.get(second['next']).json()
+        self.assertIsNone(third['next'])
+        ids = [
+            item['id'] for page in (first, second, third)
+            for item in page['results']
+        ]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_lists_without_model_instances(self):
+        """Списки строятся из values() без создания объектов моделей"""
+        urls = [
+            reverse('api:posts'),
+            reverse('api:group_posts', args=('group',)),
+            reverse('api:user_posts', args=('author',)),
+            reverse('api:follow_posts'),
+            reverse('api:comments', args=(self.posts[0].pk,)),
+        ]
+        error = AssertionError('создан объект модели')
+        for url in urls:
+            with self.subTest(url=url), \
+                    mock.patch.object(Post, 'from_db', side_effect=error), \
+                    mock.patch.object(Comment, 'from_db', side_effect=error):
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_group_and_user_posts(self):
+        """Посты группы и автора; неизвестные группа и автор - 404"""
+        response = self.client.get(
+            reverse('api:group_posts', args=('group',))
+        )
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(
+            reverse('api:user_posts', args=('author',))
+        )
+        self.assertEqual(len(response.json()['results']), 5)
+        for url in (
+            reverse('api:group_posts', args=('missing',)),
+            reverse('api:user_posts', args=('missing',)),
+            reverse('api:post_detail', args=(0,)),
+            reverse('api:comments', args=(0,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('error', response.json())
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии"""
+        post = self.posts[0]
+        response = self.client.get(
+            reverse('api:post_detail', args=(post.pk,)), {'fields': 'text'}
+        )
+        self.assertEqual(response.json(), {'text': 'Пост 0'})
+        response = self.client.get(reverse('api:comments', args=(post.pk,)))
+        [comment] = response.json()['results']
+        self.assertEqual(comment['author'], 'reader')
+        self.assertEqual(comment['post'], post.pk)
+
+    def test_groups(self):
+        response = self.client.get(reverse('api:groups'))
+        self.assertEqual(response.json()['results'], [{
+            'id': self.group.pk, 'title': 'Группа', 'slug': 'group',
+            'description': 'Описание',
+        }])
+
+    def test_groups_pages(self):
+        """Группы отдаются страницами по курсору, новые первыми"""
+        for number in range(3):
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}',
+                description=''
+            )
+        response = self.client.get(
+            reverse('api:groups'), {'limit': 3, 'fields': 'slug'}
+        )
+        data = response.json()
+        self.assertEqual(
+            [row['slug'] for row in data['results']],
+            ['group-2', 'group-1', 'group-0']
+        )
+        data = self.client.get(data['next']).json()
+        self.assertEqual(data['results'], [{'slug': 'group'}])
+        self.assertIsNone(data['next'])
+
+    def test_follow_requires_login(self):
+        """Подписки доступны только авторизованному пользователю"""
+        for name in ('api:follow_posts', 'api:follows'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 401)
+
+    def test_follow(self):
+        response = self.reader_client.get(reverse('api:follow_posts'))
+        self.assertEqual(len(response.json()['results']), 5)
+        response = self.reader_client.get(
+            reverse('api:follows'), {'fields': 'author'}
+        )
+        self.assertEqual(response.json(), {
+            'results': [{'author': 'author'}], 'next': None, 'previous': None
+        })
+
+    def test_read_only(self):
+        response = self.reader_client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,201 @@
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_safe
+
+from core.utils import FEED_ORDERING, paginate
+from posts.feeds import follow_feed
+from posts.models import Post, Group, Comment, Follow
+
+User = get_user_model()
+
+# Поле ответа -> выражение для values(). Списки строятся из словарей
+# values(), экземпляры моделей не создаются.
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS = {
+    'id': 'pk',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+}
+FOLLOW_FIELDS = {
+    'author': 'author__username',
+    'created': 'created',
+}
+COMMENT_ORDERING = ('created', 'pk')
+# У групп нет даты, ключ курсора - сам id: новые группы первыми
+GROUP_ORDERING = ('pk', 'pk')
+FOLLOW_ORDERING = ('created', 'pk')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+image_storage = Post._meta.get_field('image').storage
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(data, status=200):
+    # Без ensure_ascii кириллица не раздувается в \uXXXX
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def api_view(view):
+    """Только GET/HEAD; ошибки отдаются в JSON, а не страницей"""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'error': str(error)}, error.status)
+        except Http404:
+            return json_response({'error': 'Не найдено'}, 404)
+    return wrapper
+
+
+def requested_fields(request, available):
+    """Поля из параметра fields=a,b или все доступные"""
+    value = request.GET.get('fields')
+    if not value:
+        return list(available)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(400, 'Неизвестные поля: ' + ', '.join(unknown))
+    return names
+
+
+def requested_limit(request):
+    value = request.GET.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, 'limit должен быть числом')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def serialize(row, fields, available):
+    item = {name: row[available[name]] for name in fields}
+    if 'image' in item:
+        item['image'] = image_storage.url(item['image']) if item['image'] \
+            else None
+    return item
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def cursor_page(request, queryset, available, ordering=FEED_ORDERING):
+    """Страница списка по курсору с выбранными полями"""
+    fields = requested_fields(request, available)
+    lookups = {available[name] for name in fields} | set(ordering)
+    page = paginate(
+        queryset.values(*lookups), request.GET.get('cursor'),
+        requested_limit(request), ordering
+    )
+    return json_response({
+        'results': [serialize(row, fields, available) for row in page],
+        'next': page_link(request, page.next_cursor),
+        'previous': page_link(request, page.previous_cursor),
+    })
+
+
+def object_id(queryset):
+    pk = queryset.values_list('pk', flat=True).first()
+    if pk is None:
+        raise Http404
+    return pk
+
+
+@api_view
+def posts(request):
+    return cursor_page(request, Post.objects.all(), POST_FIELDS)
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name] for name in fields}
+    ).first()
+    if row is None:
+        raise Http404
+    return json_response(serialize(row, fields, POST_FIELDS))
+
+
+@api_view
+def comments(request, post_id):
+    object_id(Post.objects.filter(pk=post_id))
+    return cursor_page(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        COMMENT_ORDERING
+    )
+
+
+@api_view
+def groups(request):
+    return cursor_page(
+        request, Group.objects.all(), GROUP_FIELDS, GROUP_ORDERING
+    )
+
+
+@api_view
+def group_posts(request, slug):
+    group_id = object_id(Group.objects.filter(slug=slug))
+    return cursor_page(
+        request, Post.objects.filter(group_id=group_id), POST_FIELDS
+    )
+
+
+@api_view
+def user_posts(request, username):
+    author_id = object_id(User.objects.filter(username=username))
+    return cursor_page(
+        request, Post.objects.filter(author_id=author_id), POST_FIELDS
+    )
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация')
+    post_list, ordering = follow_feed(request.user)
+    return cursor_page(request, post_list, POST_FIELDS, ordering)
+
+
+@api_view
+def follows(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация')
+    return cursor_page(
+        request, Follow.objects.filter(user=request.user), FOLLOW_FIELDS,
+        FOLLOW_ORDERING
+    )
@@ -0,0 +1,193 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+
+class ClientDisconnected(Exception):
+    """Клиент отключился, не дослав тело запроса"""
+
+
+def build_environ(scope, body):
+    """WSGI environ для HTTP-запроса ASGI"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # По PEP 3333 строки environ - это байты, прочитанные как latin-1
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # Cookie по HTTP/2 может прийти несколькими заголовками,
+            # и склеиваются они через '; ', а не через запятую
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+# Сколько частей ответа ждут отправки клиенту. Когда очередь полна,
+# поток пула ждет медленного клиента, а не копит ответ в памяти.
+RESPONSE_QUEUE_SIZE = 8
+# Конец ответа в очереди
+END = object()
+
+
+def run_wsgi(application, environ, emit):
+    """
+    Выполняет WSGI-приложение и передает в emit сначала (статус,
+    заголовки), затем каждую часть тела по мере ее получения и в
+    конце END. Ответ читается и закрывается в том же потоке: части
+    StreamingHttpResponse могут обращаться к базе, close() шлет
+    request_finished, а соединения с базой принадлежат потоку.
+    """
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+
+    try:
+        result = application(environ, start_response)
+        try:
+            chunks = iter(result)
+            # Генератор может вызвать start_response на первой итерации
+            first = next(chunks, b'')
+            emit((response['status'], response['headers']))
+            for chunk in chain((first,), chunks):
+                if chunk:
+                    emit(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+    finally:
+        environ['wsgi.input'].close()
+        emit(END)
+
+
+class WSGIToASGI:
+    """
+    ASGI-приложение поверх WSGI. Тело запроса читается в цикле
+    событий, вью работает в потоке пула, а ответ отправляется по
+    частям сразу по мере их получения, не собираясь целиком в памяти.
+    """
+
+    def __init__(self, wsgi_application, workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Неподдерживаемый тип {scope['type']}")
+        try:
+            body = await self.read_body(receive)
+        except ClientDisconnected:
+            # Вью не должна получить обрезанное тело
+            return
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=RESPONSE_QUEUE_SIZE)
+        disconnected = threading.Event()
+
+        def emit(item):
+            if disconnected.is_set():
+                raise ConnectionError('Клиент отключился')
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        task = loop.run_in_executor(
+            self.executor, run_wsgi, self.wsgi_application,
+            build_environ(scope, body), emit
+        )
+        try:
+            await self.send_response(queue, send)
+        except BaseException:
+            # Поток пула не должен навсегда остаться в ожидании места
+            # в очереди: следующая часть ответа прервет его
+            disconnected.set()
+            while not queue.empty():
+                queue.get_nowait()
+            # Дожидаемся потока, чтобы его ConnectionError не осталась
+            # непрочитанной, а ответ был закрыт до выхода
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        # Исключение вью поднимается здесь
+        await task
+
+    @staticmethod
+    async def send_response(queue, send):
+        item = await queue.get()
+        if item is END:
+            return
+        status, headers = item
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        while True:
+            item = await queue.get()
+            if item is END:
+                break
+            await send({
+                'type': 'http.response.body',
+                'body': item,
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        # Картинки постов большие, поэтому тело уходит на диск так же,
+        # как у обработчиков загрузки Django
+        body = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                raise ClientDisconnected()
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        body.seek(0)
+        return body
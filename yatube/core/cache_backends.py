@@ -0,0 +1,207 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+CREATE TABLE IF NOT EXISTS cache_total (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_total (id, entries, size) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry
+BEGIN
+    UPDATE cache_total
+    SET entries = entries + 1, size = size + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry
+BEGIN
+    UPDATE cache_total
+    SET entries = entries - 1, size = size - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_update
+AFTER UPDATE OF size ON cache_entry
+BEGIN
+    UPDATE cache_total SET size = size - OLD.size + NEW.size WHERE id = 1;
+END;
+"""
+# Время последнего чтения обновляется не чаще раза в секунду,
+# чтобы чтение горячих ключей не превращалось в поток записей.
+ACCESS_GRANULARITY = 1.0
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кеш в отдельном файле SQLite, общий для всех процессов на хосте.
+    При превышении MAX_ENTRIES или MAX_SIZE (байт) вытесняются
+    записи, которые дольше всего не читались (LRU).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Соединение нельзя переносить между потоками и через fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(
+                self._path, timeout=self._busy_timeout, isolation_level=None
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return self._local.db
+
+    @contextmanager
+    def _write_lock(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _read(self, db, key, now):
+        row = db.execute(
+            'SELECT value, expires, accessed FROM cache_entry WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            return None
+        return value, accessed
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        db = self._db
+        now = time.time()
+        row = self._read(db, key, now)
+        if row is None:
+            return default
+        value, accessed = row
+        if now - accessed > ACCESS_GRANULARITY:
+            db.execute(
+                'UPDATE cache_entry SET accessed = ? WHERE key = ?', (now, key)
+            )
+        return pickle.loads(value)
+
+    def _write(self, db, key, value, timeout, now):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        # REPLACE не запускает триггер удаления, поэтому удаляем явно
+        db.execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+        db.execute(
+            'INSERT INTO cache_entry '
+            '(key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+            (key, data, self.get_backend_timeout(timeout), now, len(data))
+        )
+        self._cull(db, now)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write_lock() as db:
+            self._write(db, key, value, timeout, time.time())
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write_lock() as db:
+            if self._read(db, key, now) is not None:
+                return False
+            self._write(db, key, value, timeout, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write_lock() as db:
+            row = self._read(db, key, now)
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache_entry SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                (data, len(data), now, key)
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._db.execute(
+            'UPDATE cache_entry SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._read(self._db, key, time.time()) is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._db.execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache_entry')
+
+    def _over_limit(self, db):
+        entries, size = db.execute(
+            'SELECT entries, size FROM cache_total WHERE id = 1'
+        ).fetchone()
+        return entries > self._max_entries or size > self._max_size, entries
+
+    def _cull(self, db, now):
+        over, entries = self._over_limit(db)
+        if not over:
+            return
+        db.execute(
+            'DELETE FROM cache_entry WHERE expires IS NOT NULL '
+            'AND expires <= ?', (now,)
+        )
+        over, entries = self._over_limit(db)
+        while over and entries:
+            batch = max(entries // self._cull_frequency, 1)
+            db.execute(
+                'DELETE FROM cache_entry WHERE key IN ('
+                'SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+                (batch,)
+            )
+            over, entries = self._over_limit(db)
+
+    def close(self, **kwargs):
+        # Соединение живет дольше запроса, как и у файлового кеша
+        pass
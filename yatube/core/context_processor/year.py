@@ -1,8 +1,28 @@
+import time
+from datetime import timedelta
+
 from django.utils import timezone
 
+_year = None
+_valid_until = 0.0
+
+
+def current_year():
+    """
+    Текущий год. Дата запрашивается не чаще раза в сутки:
+    значение живет до ближайшей полуночи по TIME_ZONE.
+    """
+    global _year, _valid_until
+    if time.time() >= _valid_until:
+        now = timezone.localtime()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        _valid_until = (midnight + timedelta(days=1)).timestamp()
+        _year = now.year
+    return _year
+
 
 def year(request):
     """Добавляет переменную с текущим годом."""
     return {
-        'year': timezone.now().year
+        'year': current_year()
     }
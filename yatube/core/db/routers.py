@@ -0,0 +1,52 @@
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def start_routing(pinned=False):
+    """Сбрасывает выбор базы в начале запроса"""
+    _state.pinned = pinned
+    _state.wrote = False
+    _state.replica = None
+
+
+def wrote_to_primary():
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    """
+    Чтение идет в одну из реплик DATABASE_REPLICAS, запись - в default.
+    После первой записи, а также в запросах с закрепленным основным
+    сервером, чтение тоже идет в default, чтобы пользователь сразу
+    видел свои изменения. Реплика выбирается один раз на запрос.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or getattr(_state, 'pinned', False):
+            return PRIMARY
+        if getattr(_state, 'replica', None) is None:
+            _state.replica = random.choice(replicas)
+        return _state.replica
+
+    def db_for_write(self, model, **hints):
+        _state.pinned = True
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
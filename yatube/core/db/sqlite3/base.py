@@ -0,0 +1,89 @@
+import threading
+from collections import defaultdict
+
+from django.db.backends.sqlite3 import base
+from django.db.backends.sqlite3.base import Database
+
+# Значения по умолчанию; переопределяются в OPTIONS['pragmas']
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Блокировка записи на каждый файл базы, общая для потоков процесса
+_writer_locks = defaultdict(threading.Lock)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite для работы под нагрузкой: WAL и прагмы из PRAGMAS
+    на каждом соединении, транзакции BEGIN IMMEDIATE и один пишущий
+    поток на процесс. Читатели в WAL не блокируют писателя, а писатели
+    ждут друг друга в очереди вместо ошибки "database is locked".
+    Очередь - только для транзакций atomic(): вью записи сохраняют
+    в ней объект вместе с записями обработчиков сигналов. Отдельные
+    запросы в autocommit ее обходят и ждут блокировку SQLite до
+    timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._writer_lock = None
+        self._timeout = 20
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.setdefault('timeout', 20)
+        self._timeout = kwargs['timeout']
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = {
+            **PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})
+        }
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # Обычный BEGIN берет блокировку записи только при первой записи,
+        # и если ее уже держит другое соединение, SQLite сразу отвечает
+        # "database is locked", не дожидаясь timeout. IMMEDIATE берет ее
+        # в начале транзакции и ждет своей очереди.
+        lock = _writer_locks[self.settings_dict['NAME']]
+        if not lock.acquire(timeout=self._timeout):
+            with self.wrap_database_errors:
+                raise Database.OperationalError('database is locked')
+        self._writer_lock = lock
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except BaseException:
+            self._release_writer()
+            raise
+
+    def _release_writer(self):
+        if self._writer_lock is not None:
+            self._writer_lock.release()
+            self._writer_lock = None
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_writer()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_writer()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_writer()
@@ -0,0 +1,111 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from core.benchmark import summarize
+
+
+def create_cache(name, location):
+    params = dict(settings.CACHE_BACKENDS[name])
+    backend = import_string(params.pop('BACKEND'))
+    if 'LOCATION' in params:
+        params['LOCATION'] = location
+    return backend(params.pop('LOCATION', ''), params)
+
+
+def run_worker(name, location, requests, keys, render_ms, seed, results):
+    """
+    Имитирует воркер, который отдает фрагменты страниц: ключи выбираются
+    с распределением Ципфа, промах стоит render_ms на рендеринг и запись.
+    """
+    cache = create_cache(name, location)
+    rnd = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    payload = 'x' * 4096
+    hits = 0
+    latencies = []
+    for key in rnd.choices(range(keys), weights, k=requests):
+        started = time.perf_counter()
+        if cache.get(f'fragment:{key}') is None:
+            time.sleep(render_ms / 1000)
+            cache.set(f'fragment:{key}', payload, 600)
+        else:
+            hits += 1
+        latencies.append(time.perf_counter() - started)
+    results.put((hits, latencies))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает долю попаданий и задержки бекендов кеша '
+        'при нескольких процессах-воркерах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends', nargs='+', default=list(settings.CACHE_BACKENDS)
+        )
+        parser.add_argument(
+            '--workers', nargs='+', type=int, default=[1, 4, 8]
+        )
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--render-ms', type=float, default=2.0)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        report = []
+        for name in options['backends']:
+            for workers in options['workers']:
+                directory = tempfile.mkdtemp(prefix='yatube-cache-bench-')
+                location = directory
+                if name == 'sqlite':
+                    location = os.path.join(directory, 'cache.sqlite3')
+                results = context.Queue()
+                processes = [
+                    context.Process(target=run_worker, args=(
+                        name, location, options['requests'],
+                        options['keys'], options['render_ms'],
+                        number, results
+                    ))
+                    for number in range(workers)
+                ]
+                started = time.perf_counter()
+                for process in processes:
+                    process.start()
+                collected = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+                elapsed = time.perf_counter() - started
+                shutil.rmtree(directory, ignore_errors=True)
+
+                hits = sum(hit for hit, _ in collected)
+                latencies = [
+                    value for _, values in collected for value in values
+                ]
+                row = {
+                    'backend': name,
+                    'workers': workers,
+                    'hit_rate': round(hits / len(latencies), 4),
+                    'throughput_rps': round(len(latencies) / elapsed, 1),
+                    **summarize(latencies),
+                }
+                report.append(row)
+                self.stdout.write(
+                    f"{name:>7} x{workers:<2} "
+                    f"hit rate {row['hit_rate']:.2%}  "
+                    f"p50 {row['p50_ms']} ms  p99 {row['p99_ms']} ms  "
+                    f"{row['throughput_rps']} rps"
+                )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,149 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from core.benchmark import summarize
+
+ALIAS = 'benchmark'
+PROFILES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3'},
+    'tuned': {'ENGINE': 'core.db.sqlite3'},
+}
+SCHEMA = """
+CREATE TABLE bench_post (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    author INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX bench_post_author ON bench_post (author);
+"""
+
+
+def create_database(path, rows):
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    db.executemany(
+        'INSERT INTO bench_post (author, text) VALUES (?, ?)',
+        ((number % 100, 'x' * 200) for number in range(rows))
+    )
+    db.commit()
+    db.close()
+
+
+def run_worker(profile, path, role, duration, seed, results):
+    """
+    Писатель в транзакции читает и пишет, как get_or_create или
+    сохранение поста с сигналами; читатель выбирает страницу ленты.
+    """
+    connections.databases[ALIAS] = {**PROFILES[profile], 'NAME': path}
+    connection = connections[ALIAS]
+    rnd = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        author = rnd.randrange(100)
+        started = time.perf_counter()
+        try:
+            if role == 'writer':
+                with transaction.atomic(using=ALIAS):
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            'SELECT COUNT(*) FROM bench_post '
+                            'WHERE author = %s', [author]
+                        )
+                        cursor.execute(
+                            'INSERT INTO bench_post (author, text) '
+                            'VALUES (%s, %s)', [author, 'x' * 200]
+                        )
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT id, text FROM bench_post WHERE author = %s '
+                        'ORDER BY id DESC LIMIT 10', [author]
+                    )
+                    cursor.fetchall()
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    results.put((role, latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентные чтение и запись в SQLite через '
+        'стандартный бекенд Django и core.db.sqlite3'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', choices=PROFILES, default=list(PROFILES)
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        roles = (
+            ['reader'] * options['readers'] + ['writer'] * options['writers']
+        )
+        report = []
+        for profile in options['profiles']:
+            directory = tempfile.mkdtemp(prefix='yatube-sqlite-bench-')
+            path = os.path.join(directory, 'db.sqlite3')
+            create_database(path, options['rows'])
+            results = context.Queue()
+            processes = [
+                context.Process(target=run_worker, args=(
+                    profile, path, role, options['duration'], number, results
+                ))
+                for number, role in enumerate(roles)
+            ]
+            for process in processes:
+                process.start()
+            collected = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            shutil.rmtree(directory, ignore_errors=True)
+
+            for role in ('reader', 'writer'):
+                latencies = [
+                    value for name, values, _ in collected if name == role
+                    for value in values
+                ]
+                errors = sum(
+                    count for name, _, count in collected if name == role
+                )
+                row = {
+                    'profile': profile,
+                    'role': role,
+                    'operations': len(latencies),
+                    'errors': errors,
+                    'throughput_ops': round(
+                        len(latencies) / options['duration'], 1
+                    ),
+                    **summarize(latencies),
+                }
+                report.append(row)
+                self.stdout.write(
+                    f"{profile:>8} {role:<7} "
+                    f"{row['throughput_ops']:>9} ops/s  "
+                    f"errors {errors:<6} "
+                    f"p50 {row['p50_ms']} ms  p99 {row['p99_ms']} ms"
+                )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,299 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.template.base import Template
+from django.template.loader_tags import BLOCK_CONTEXT_KEY, BlockNode
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    """Вью выполнила больше SQL-запросов, чем разрешено в QUERY_BUDGETS"""
+
+
+class RequestStats:
+    """Счетчики одного запроса: SQL-запросы и время SQL и шаблонов"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request():
+    _local.stats = None
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def untracked():
+    """Не учитывать в метриках запроса фоновую по смыслу работу"""
+    stats = current_stats()
+    _local.stats = None
+    try:
+        yield
+    finally:
+        _local.stats = stats
+
+
+def count_query(execute, sql, params, many, context):
+    """Обертка execute_wrapper, считающая запросы текущего запроса"""
+    stats = current_stats()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.sql_time += time.perf_counter() - started
+
+
+def instrument_templates():
+    """
+    Засекает время рендеринга шаблонов. Учитывается только внешний
+    шаблон, вложенные include уже входят в его время.
+    """
+    render = Template.render
+    if getattr(render, 'instrumented', False):
+        return
+
+    def timed_render(self, context):
+        stats = current_stats()
+        if stats is None or stats.rendering:
+            return render(self, context)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.rendering = False
+            stats.template_time += time.perf_counter() - started
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+class TemplateProfile:
+    """
+    Время рендеринга по шаблонам: полное (вместе с include и
+    родителями extends) и собственное, без вложенных шаблонов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stats = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def record(self, name, renders, total, own):
+        with self._lock:
+            stats = self._stats[name]
+            stats[0] += renders
+            stats[1] += total
+            stats[2] += own
+
+    def report(self):
+        """Шаблоны по убыванию собственного времени"""
+        with self._lock:
+            rows = [
+                {
+                    'template': name,
+                    'renders': renders,
+                    'total_ms': round(total * 1000, 3),
+                    'own_ms': round(own * 1000, 3),
+                }
+                for name, (renders, total, own) in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: -row['own_ms'])
+
+    def render(self):
+        """Текст метрик в формате Prometheus"""
+        rows = sorted(self.report(), key=lambda row: row['template'])
+        lines = [
+            '# HELP yatube_template_renders_total Рендеринги шаблона',
+            '# TYPE yatube_template_renders_total counter',
+        ]
+        lines.extend(
+            f'yatube_template_renders_total{{template="{row["template"]}"}} '
+            f'{row["renders"]}'
+            for row in rows
+        )
+        lines += [
+            '# HELP yatube_template_own_seconds_total '
+            'Время шаблона без вложенных шаблонов',
+            '# TYPE yatube_template_own_seconds_total counter',
+        ]
+        lines.extend(
+            f'yatube_template_own_seconds_total'
+            f'{{template="{row["template"]}"}} {row["own_ms"] / 1000:.6f}'
+            for row in rows
+        )
+        return '\n'.join(lines) + '\n'
+
+
+template_profile = TemplateProfile()
+
+
+def _profiled(name, renders, func, *args):
+    """Выполняет func как кадр профиля шаблона name"""
+    frames = getattr(_local, 'template_frames', None)
+    if frames is None:
+        frames = _local.template_frames = []
+    frames.append(0.0)
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        total = time.perf_counter() - started
+        nested = frames.pop()
+        if frames:
+            frames[-1] += total
+        # Полное время блока уже входит в шаблон, который его рендерит
+        template_profile.record(
+            name, renders, total if renders else 0.0, total - nested
+        )
+
+
+def profile_templates():
+    """
+    Включает запись времени каждого шаблона в template_profile.
+    Перехватывается Template._render: через него рендерятся и
+    include, и родители extends. Время {% block %} относится к
+    шаблону, в котором написано содержимое блока, а не к base.html.
+    """
+    render = Template._render
+    if getattr(render, 'profiled', False):
+        return
+    render_block = BlockNode.render
+
+    def profiled_render(self, context):
+        name = self.origin.template_name or self.origin.name
+        return _profiled(name, 1, render, self, context)
+
+    def profiled_block(self, context):
+        block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+        block = block_context and block_context.get_block(self.name)
+        origin = (block or self).origin
+        name = origin.template_name or origin.name
+        return _profiled(name, 0, render_block, self, context)
+
+    profiled_render.profiled = True
+    Template._render = profiled_render
+    BlockNode.render = profiled_block
+
+
+class Registry:
+    """
+    Метрики запросов в памяти процесса. При нескольких воркерах
+    каждый отдает на /metrics свои значения.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = defaultdict(int)
+            self._buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+            self._durations = defaultdict(float)
+            self._counts = defaultdict(int)
+            self._queries = defaultdict(int)
+            self._sql_time = defaultdict(float)
+            self._template_time = defaultdict(float)
+            self._over_budget = defaultdict(int)
+
+    def observe(self, view, method, status, duration, stats, over_budget):
+        with self._lock:
+            self._requests[view, method, str(status)] += 1
+            buckets = self._buckets[view]
+            for number, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    buckets[number] += 1
+            self._durations[view] += duration
+            self._counts[view] += 1
+            self._queries[view] += stats.queries
+            self._sql_time[view] += stats.sql_time
+            self._template_time[view] += stats.template_time
+            if over_budget:
+                self._over_budget[view] += 1
+
+    def render(self):
+        """Текст метрик в формате Prometheus"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                lines.append(f'{name}{suffix}{{{labels}}} {value}')
+
+        with self._lock:
+            metric(
+                'yatube_http_requests_total', 'counter',
+                'Обработанные запросы',
+                (
+                    ('', f'view="{view}",method="{method}",status="{status}"',
+                     value)
+                    for (view, method, status), value
+                    in sorted(self._requests.items())
+                )
+            )
+            histogram = []
+            for view in sorted(self._counts):
+                bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+                values = self._buckets[view] + [self._counts[view]]
+                histogram.extend(
+                    ('_bucket', f'view="{view}",le="{bound}"', value)
+                    for bound, value in zip(bounds, values)
+                )
+                histogram.append(
+                    ('_sum', f'view="{view}"', f'{self._durations[view]:.6f}')
+                )
+                histogram.append(
+                    ('_count', f'view="{view}"', self._counts[view])
+                )
+            metric(
+                'yatube_http_request_duration_seconds', 'histogram',
+                'Полное время обработки запроса', histogram
+            )
+            for name, help_text, values in (
+                ('yatube_db_queries_total', 'SQL-запросы', self._queries),
+                (
+                    'yatube_db_query_seconds_total', 'Время SQL-запросов',
+                    self._sql_time
+                ),
+                (
+                    'yatube_template_render_seconds_total',
+                    'Время рендеринга шаблонов', self._template_time
+                ),
+                (
+                    'yatube_query_budget_exceeded_total',
+                    'Запросы сверх бюджета SQL-запросов', self._over_budget
+                ),
+            ):
+                metric(name, 'counter', help_text, (
+                    ('', f'view="{view}"', value)
+                    for view, value in sorted(values.items())
+                ))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
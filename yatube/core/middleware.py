@@ -0,0 +1,95 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .db.routers import start_routing, wrote_to_primary
+from .metrics import (
+    QueryBudgetExceeded, count_query, finish_request, instrument_templates,
+    profile_templates, registry, start_request
+)
+
+logger = logging.getLogger('yatube.requests')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'yatube_primary'
+
+
+class MetricsMiddleware:
+    """
+    Считает для каждого запроса число и время SQL-запросов, время
+    рендеринга шаблонов (при TEMPLATE_TIMING) и полное время ответа.
+    Пишет строку в лог, копит метрики для /metrics и проверяет бюджет
+    SQL-запросов вью.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.TEMPLATE_TIMING:
+            instrument_templates()
+        if settings.TEMPLATE_PROFILING:
+            profile_templates()
+
+    def __call__(self, request):
+        stats = start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(count_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            finish_request()
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        budget = settings.QUERY_BUDGETS.get(view)
+        over_budget = budget is not None and stats.queries > budget
+        registry.observe(
+            view, request.method, response.status_code, duration, stats,
+            over_budget
+        )
+        logger.info(
+            'view=%s method=%s status=%s duration_ms=%.1f queries=%d '
+            'sql_ms=%.1f template_ms=%.1f',
+            view, request.method, response.status_code, duration * 1000,
+            stats.queries, stats.sql_time * 1000, stats.template_time * 1000
+        )
+        if over_budget:
+            message = (
+                f'{view}: {stats.queries} SQL-запросов при бюджете {budget}'
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Закрепляет чтение за основной базой на REPLICA_PIN_SECONDS после
+    записи: реплики могут отставать, а автор должен видеть свой пост.
+    Небезопасные методы (POST и др.) всегда работают с основной базой.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start_routing(
+            pinned=request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+        )
+        response = self.get_response(request)
+        if wrote_to_primary():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+        start_routing()
+        return response
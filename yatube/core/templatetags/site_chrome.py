@@ -0,0 +1,70 @@
+from django import template
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from core.context_processor.year import current_year
+
+register = template.Library()
+
+# Вместо имени пользователя в закешированную шапку попадает метка,
+# имя подставляется при каждом выводе
+USERNAME_PLACEHOLDER = '\x00username\x00'
+
+_fragments = {}
+
+
+def _render(key, template_name, context):
+    """
+    Рендерит фрагмент один раз на процесс. Как и кеширующий загрузчик
+    шаблонов, при DEBUG кеш не используется, чтобы правки шаблонов
+    были видны сразу.
+    """
+    if settings.DEBUG:
+        return render_to_string(template_name, context)
+    fragment = _fragments.get(key)
+    if fragment is None:
+        fragment = _fragments[key] = render_to_string(template_name, context)
+    return fragment
+
+
+@register.simple_tag(takes_context=True)
+def site_header(context):
+    """Шапка сайта: рендерится раз на (вход выполнен, текущая вью)"""
+    request = context.get('request')
+    user = getattr(request, 'user', None)
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.view_name if match else None
+    is_authenticated = bool(user and user.is_authenticated)
+    header = _render(
+        ('header', is_authenticated, view_name),
+        'includes/header.html',
+        {
+            'is_authenticated': is_authenticated,
+            'view_name': view_name,
+            'username': USERNAME_PLACEHOLDER,
+        }
+    )
+    username = user.get_username() if is_authenticated else ''
+    return mark_safe(
+        header.replace(USERNAME_PLACEHOLDER, conditional_escape(username))
+    )
+
+
+@register.simple_tag
+def site_footer():
+    """Подвал сайта: меняется только с годом"""
+    year = current_year()
+    return mark_safe(
+        _render(('footer', year), 'includes/footer.html', {'year': year})
+    )
+
+
+def clear_fragments(**kwargs):
+    _fragments.clear()
+
+
+# Тесты с override_settings могут подменить URL и шаблоны
+setting_changed.connect(clear_fragments)
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from core.asgi import WSGIToASGI
+
+
+def echo_application(environ, start_response):
+    """WSGI-приложение, возвращающее то, что получило"""
+    body = environ['wsgi.input'].read()
+    start_response('201 Created', [
+        ('Content-Type', 'text/plain'),
+        ('X-Thread', threading.current_thread().name),
+    ])
+    return [
+        environ['REQUEST_METHOD'].encode(), b' ',
+        environ['PATH_INFO'].encode('latin-1'), b'?',
+        environ['QUERY_STRING'].encode(), b' ',
+        environ.get('HTTP_COOKIE', '').encode(), b' ',
+        environ.get('CONTENT_TYPE', '').encode(), b' ',
+        body,
+    ]
+
+
+class WSGIToASGITests(SimpleTestCase):
+    def setUp(self):
+        self.application = WSGIToASGI(echo_application, workers=2)
+        self.addCleanup(self.application.executor.shutdown)
+
+    def call(self, scope, chunks):
+        messages = [
+            {
+                'type': 'http.request',
+                'body': chunk,
+                'more_body': number < len(chunks) - 1,
+            }
+            for number, chunk in enumerate(chunks)
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return sent
+
+    def test_request_passed_to_wsgi(self):
+        """Метод, путь, параметры, заголовки и тело доходят до WSGI"""
+        sent = self.call({
+            'type': 'http',
+            'method': 'POST',
+            'path': '/profile/Пользователь/',
+            'query_string': b'page=2',
+            'headers': [
+                (b'cookie', b'a=1'),
+                (b'cookie', b'b=2'),
+                (b'content-type', b'text/plain'),
+            ],
+            'client': ('127.0.0.1', 1234),
+            'server': ('testserver', 80),
+        }, [b'first ', b'second'])
+        start, *body = sent
+        self.assertEqual(start['status'], 201)
+        headers = dict(start['headers'])
+        self.assertEqual(headers[b'content-type'], b'text/plain')
+        # Вью выполняется в пуле, а не в цикле событий
+        self.assertTrue(headers[b'x-thread'].startswith(b'asgi'))
+        self.assertEqual(
+            b''.join(message['body'] for message in body),
+            'POST /profile/Пользователь/?page=2 a=1; b=2 text/plain '
+            'first second'.encode()
+        )
+        self.assertFalse(body[-1].get('more_body', False))
+
+    def test_response_streamed_by_chunks(self):
+        """Каждая часть ответа уходит клиенту, не дожидаясь следующих"""
+        first_sent = threading.Event()
+
+        def streaming_application(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            yield b'first'
+            # Вторая часть появится, только когда первая уже отправлена
+            if not first_sent.wait(timeout=5):
+                raise AssertionError('Первая часть ответа не отправлена')
+            yield b'second'
+
+        application = WSGIToASGI(streaming_application, workers=1)
+        self.addCleanup(application.executor.shutdown)
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body') == b'first':
+                first_sent.set()
+
+        asyncio.run(application(
+            {'type': 'http', 'method': 'GET', 'path': '/'}, receive, send
+        ))
+        self.assertEqual(
+            [(message.get('body'), message.get('more_body', False))
+             for message in sent[1:]],
+            [(b'first', True), (b'second', True), (b'', False)]
+        )
+
+    def test_disconnect_during_body(self):
+        """Если клиент отключился до конца тела, вью не выполняется"""
+        called = []
+
+        def application(environ, start_response):
+            called.append(environ)
+            start_response('200 OK', [])
+            return [b'']
+
+        application = WSGIToASGI(application, workers=1)
+        self.addCleanup(application.executor.shutdown)
+        messages = [
+            {'type': 'http.request', 'body': b'part', 'more_body': True},
+            {'type': 'http.disconnect'},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(
+            {'type': 'http', 'method': 'POST', 'path': '/'}, receive, send
+        ))
+        self.assertEqual(called, [])
+        self.assertEqual(sent, [])
+
+    def test_disconnect_during_response(self):
+        """После отключения клиента ответ закрывается до выхода"""
+        closed = threading.Event()
+
+        def streaming_application(environ, start_response):
+            start_response('200 OK', [])
+            try:
+                while True:
+                    yield b'chunk'
+            finally:
+                # Без ожидания потока обработчик вернулся бы раньше
+                time.sleep(0.1)
+                closed.set()
+
+        application = WSGIToASGI(streaming_application, workers=1)
+        self.addCleanup(application.executor.shutdown)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                raise ConnectionResetError()
+
+        with self.assertRaises(ConnectionResetError):
+            asyncio.run(application(
+                {'type': 'http', 'method': 'GET', 'path': '/'},
+                receive, send
+            ))
+        self.assertTrue(closed.is_set())
+
+    def test_lifespan(self):
+        """Сервер получает подтверждение запуска и остановки"""
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            sent,
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.cache_backends import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(
+            f'{self.directory}/cache.sqlite3', {'OPTIONS': options}
+        )
+
+    def test_get_set_add_incr(self):
+        """Кеш поддерживает базовые операции Django"""
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('key')
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_expired_entries_are_missing(self):
+        """Истекшие записи не возвращаются"""
+        self.cache.set('key', 'value', 0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'value'))
+
+    def test_shared_between_instances(self):
+        """Записи видны другим экземплярам с тем же файлом"""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читанные записи"""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for number in range(3):
+            cache.set(f'key{number}', number)
+        cache._db.execute(
+            "UPDATE cache_entry SET accessed = 0 WHERE key LIKE '%key1'"
+        )
+        cache.set('key3', 3)
+        self.assertIsNone(cache.get('key1'))
+        for key in ('key0', 'key2', 'key3'):
+            self.assertTrue(cache.has_key(key))
+
+    def test_size_limit(self):
+        """Суммарный размер записей не превышает MAX_SIZE"""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for number in range(10):
+            cache.set(f'key{number}', 'x' * 2000)
+        size = cache._db.execute('SELECT SUM(size) FROM cache_entry')
+        self.assertLessEqual(size.fetchone()[0], 10000)
+        self.assertTrue(cache.has_key('key9'))
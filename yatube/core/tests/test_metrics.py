@@ -0,0 +1,175 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.template import Context, Engine
+from django.template.base import Template
+from django.template.loader_tags import BlockNode
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.metrics import (
+    QueryBudgetExceeded, profile_templates, registry, template_profile
+)
+from posts.models import Post
+
+User = get_user_model()
+
+METRICS_TOKEN = 'metrics-token'
+
+
+@override_settings(METRICS_TOKEN=METRICS_TOKEN)
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.create(
+            text='Текст поста',
+            author=User.objects.create_user(username='User')
+        )
+
+    def setUp(self):
+        self.client = Client()
+        registry.reset()
+
+    def test_metrics_endpoint(self):
+        """/metrics отдает счетчики запросов вью в формате Prometheus"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}'
+        )
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{view="posts:index",method="GET",status="200"} 2',
+            text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 2',
+            text
+        )
+        self.assertIn('yatube_db_queries_total{view="posts:index"}', text)
+        self.assertIn(
+            'yatube_template_render_seconds_total{view="posts:index"}', text
+        )
+
+    def test_metrics_hidden_from_other_hosts(self):
+        """/metrics недоступен с адресов не из METRICS_IPS"""
+        response = self.client.get(
+            '/metrics', REMOTE_ADDR='10.0.0.1',
+            HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_metrics_require_token(self):
+        """/metrics недоступен без верного METRICS_TOKEN"""
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.client.get('/metrics', **headers)
+                self.assertEqual(response.status_code, 404)
+        with self.settings(METRICS_TOKEN=''):
+            response = self.client.get(
+                '/metrics', HTTP_AUTHORIZATION='Bearer '
+            )
+            self.assertEqual(response.status_code, 404)
+
+    def test_template_timing_is_opt_in(self):
+        """Template.render подменяется только при TEMPLATE_TIMING"""
+        patcher = mock.patch.object(Template, 'render', Template.render)
+        original = patcher.start()
+        self.addCleanup(patcher.stop)
+        Client().get(reverse('posts:index'))
+        self.assertIs(Template.render, original)
+        with self.settings(TEMPLATE_TIMING=True):
+            with self.assertLogs('yatube.requests', 'INFO') as logs:
+                Client().get(reverse('posts:index'))
+        self.assertIsNot(Template.render, original)
+        self.assertNotIn('template_ms=0.0', logs.output[0])
+
+    def test_request_logged(self):
+        """Каждый запрос пишет строку с метриками в лог"""
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertRegex(
+            logs.output[0],
+            r'view=posts:index method=GET status=200 duration_ms=\S+ '
+            r'queries=\d+ sql_ms=\S+ template_ms=\S+'
+        )
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:index': 0}, QUERY_BUDGET_STRICT=True
+    )
+    def test_budget_raises_in_strict_mode(self):
+        """В тестах превышение бюджета запросов - исключение"""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:index': 0}, QUERY_BUDGET_STRICT=False
+    )
+    def test_budget_warns_in_production(self):
+        """В работе превышение бюджета запросов пишется в лог"""
+        with self.assertLogs('yatube.requests', 'WARNING') as logs:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:index', logs.output[-1])
+        self.assertIn(
+            'yatube_query_budget_exceeded_total{view="posts:index"} 1',
+            registry.render()
+        )
+
+
+class TemplateProfileTests(SimpleTestCase):
+    def setUp(self):
+        # Перехват шаблонов не должен остаться в других тестах
+        for target, attribute in (
+            (Template, '_render'), (BlockNode, 'render')
+        ):
+            patcher = mock.patch.object(
+                target, attribute, getattr(target, attribute)
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        profile_templates()
+        template_profile.reset()
+
+    def test_own_time_per_template_and_block(self):
+        """Время блоков относится к шаблону, где написано их содержимое"""
+        engine = Engine(loaders=[('django.template.loaders.locmem.Loader', {
+            'base.html': 'A{% block content %}{% endblock %}'
+                         '{% include "inc.html" %}',
+            'page.html': '{% extends "base.html" %}'
+                         '{% block content %}B{% endblock %}',
+            'inc.html': 'C',
+        })])
+        for _ in range(2):
+            self.assertEqual(
+                engine.get_template('page.html').render(Context()), 'ABC'
+            )
+        rows = {row['template']: row for row in template_profile.report()}
+        self.assertEqual(
+            {name: row['renders'] for name, row in rows.items()},
+            {'page.html': 2, 'base.html': 2, 'inc.html': 2}
+        )
+        page = rows['page.html']
+        self.assertGreaterEqual(
+            page['total_ms'],
+            rows['base.html']['own_ms'] + rows['inc.html']['own_ms']
+        )
+        self.assertGreater(page['own_ms'], 0)
+
+    @override_settings(TEMPLATE_PROFILING=True, METRICS_TOKEN=METRICS_TOKEN)
+    def test_metrics_include_templates(self):
+        """При TEMPLATE_PROFILING на /metrics есть время шаблонов"""
+        Engine(loaders=[('django.template.loaders.locmem.Loader', {
+            'inc.html': 'C',
+        })]).get_template('inc.html').render(Context())
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}'
+        )
+        self.assertContains(
+            response, 'yatube_template_renders_total{template="inc.html"} 1'
+        )
+        self.assertContains(response, 'yatube_template_own_seconds_total')
@@ -0,0 +1,66 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db.routers import ReplicaRouter, start_routing
+from core.middleware import PIN_COOKIE, ReplicaPinMiddleware
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        start_routing()
+        self.addCleanup(start_routing)
+
+    def test_reads_go_to_one_replica(self):
+        """Чтение идет в одну и ту же реплику в пределах запроса"""
+        alias = self.router.db_for_read(Post)
+        self.assertIn(alias, ('replica_1', 'replica_2'))
+        for _ in range(10):
+            self.assertEqual(self.router.db_for_read(Post), alias)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик все читается из default"""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_read_your_writes(self):
+        """После записи чтение в том же запросе идет в default"""
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_replicas_not_migrated(self):
+        """Миграции к репликам не применяются"""
+        self.assertFalse(self.router.allow_migrate('replica_1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    def run_middleware(self, request, write=False):
+        reads = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Post)
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(view)(request)
+        return reads[0], response
+
+    def test_write_pins_user_to_primary(self):
+        """После записи пользователь какое-то время читает из default"""
+        alias, response = self.run_middleware(self.factory.get('/'))
+        self.assertNotEqual(alias, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        alias, response = self.run_middleware(
+            self.factory.post('/create/'), write=True
+        )
+        self.assertEqual(alias, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        alias, _ = self.run_middleware(request)
+        self.assertEqual(alias, 'default')
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.context_processor import year
+from core.templatetags import site_chrome
+
+User = get_user_model()
+
+
+class SiteChromeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='<b>Имя</b>')
+
+    def setUp(self):
+        site_chrome.clear_fragments()
+        self.client.force_login(SiteChromeTests.user)
+
+    def test_header_rendered_once_per_view(self):
+        """Шапка рендерится один раз для состояния входа и вью"""
+        with mock.patch(
+            'core.templatetags.site_chrome.render_to_string',
+            wraps=site_chrome.render_to_string
+        ) as render:
+            for _ in range(3):
+                self.client.get(reverse('about:tech'))
+        rendered = [call.args[0] for call in render.call_args_list]
+        self.assertEqual(
+            rendered, ['includes/header.html', 'includes/footer.html']
+        )
+
+    def test_username_injected_and_escaped(self):
+        """Имя пользователя подставляется в готовую шапку с экранированием"""
+        response = self.client.get(reverse('about:tech'))
+        self.assertContains(response, 'Пользователь: &lt;b&gt;Имя&lt;/b&gt;')
+        self.assertNotContains(response, site_chrome.USERNAME_PLACEHOLDER)
+
+        other = User.objects.create_user(username='Другой')
+        self.client.force_login(other)
+        response = self.client.get(reverse('about:tech'))
+        self.assertContains(response, 'Пользователь: Другой')
+
+    def test_header_depends_on_auth_and_view(self):
+        """Для гостя и на другой вью шапка своя"""
+        response = self.client.get(reverse('about:tech'))
+        self.assertContains(response, 'Выйти')
+        self.client.logout()
+        response = self.client.get(reverse('about:author'))
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'Выйти')
+
+    @override_settings(DEBUG=True)
+    def test_no_cache_in_debug(self):
+        """При DEBUG фрагменты не запоминаются"""
+        self.client.get(reverse('about:tech'))
+        self.assertFalse(site_chrome._fragments)
+
+    def test_year_computed_once_a_day(self):
+        """Год вычисляется заново только после полуночи"""
+        year._valid_until = 0.0
+        with mock.patch(
+            'core.context_processor.year.timezone.localtime',
+            wraps=year.timezone.localtime
+        ) as localtime:
+            for _ in range(5):
+                self.client.get(reverse('about:tech'))
+            self.assertEqual(localtime.call_count, 1)
+            with mock.patch(
+                'core.context_processor.year.time.time',
+                return_value=year._valid_until
+            ):
+                self.assertEqual(year.current_year(), year._year)
+            self.assertEqual(localtime.call_count, 2)
@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.db import transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.connections = ConnectionHandler({
+            'default': {
+                'ENGINE': 'core.db.sqlite3',
+                'NAME': f'{self.directory}/db.sqlite3',
+            },
+        })
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE item (id INTEGER PRIMARY KEY, value INTEGER)'
+            )
+        # atomic() берет соединения из этого обработчика, а не из settings
+        patcher = mock.patch(
+            'django.db.transaction.connections', self.connections
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.connections.close_all()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_pragmas(self):
+        """Соединение открывается в режиме WAL с настроенными прагмами"""
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+    def test_concurrent_writers_wait(self):
+        """Транзакции чтения и записи из разных потоков не падают"""
+        errors = []
+
+        def write():
+            connection = self.connections['default']
+            try:
+                for number in range(20):
+                    with transaction.atomic():
+                        with connection.cursor() as cursor:
+                            cursor.execute('SELECT COUNT(*) FROM item')
+                            # Даем другим потокам начать свои транзакции
+                            time.sleep(0.001)
+                            cursor.execute(
+                                'INSERT INTO item (value) VALUES (%s)',
+                                [number]
+                            )
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 80)
+
+    def test_writer_lock_released_on_rollback(self):
+        """Ошибка в транзакции освобождает очередь писателей"""
+        with self.assertRaises(ZeroDivisionError):
+            with transaction.atomic():
+                with self.connections['default'].cursor() as cursor:
+                    cursor.execute('INSERT INTO item (value) VALUES (1)')
+                1 / 0
+        with transaction.atomic():
+            with self.connections['default'].cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM item')
+                self.assertEqual(cursor.fetchone()[0], 0)
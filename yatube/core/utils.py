@@ -1,17 +1,169 @@
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+import base64
 
+from django.core.paginator import Paginator, Page
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
-def paginate(queryset, page, count=10):
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+FEED_ORDERING = ('pub_date', 'pk')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, obj, ordering=FEED_ORDERING):
     """
-    Функция для разбивки объектов запроса на страницы
+    Кодирует позицию объекта по полям ordering в непрозрачный курсор.
+    Объект может быть и моделью, и словарем из values(). Ключ - дата
+    или число (например, рейтинг поста).
     """
-    paginator = Paginator(queryset, count)
+    key_field, pk_field = ordering
+    if isinstance(obj, dict):
+        key, pk = obj[key_field], obj[pk_field]
+    else:
+        key, pk = getattr(obj, key_field), getattr(obj, pk_field)
+    value = key.isoformat() if hasattr(key, 'isoformat') else repr(key)
+    raw = f'{direction}|{value}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
 
+
+def decode_cursor(cursor):
+    """Возвращает (направление, значение ключа, pk) из курсора"""
     try:
-        results = paginator.page(page)
-    except PageNotAnInteger:
-        results = paginator.page(1)
-    except EmptyPage:
-        results = paginator.page(paginator.num_pages)
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, value, pk = raw.split('|')
+        key = parse_datetime(value)
+        if key is None:
+            key = float(value)
+        pk = int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or key is None:
+        raise InvalidCursor(cursor)
+    return direction, key, pk
+
+
+class CursorPage(Page):
+    """
+    Страница, полученная поиском по ключу, а не через OFFSET.
+    Номер страницы неизвестен, вместо номеров используются курсоры.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Page (cursor)>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(CURSOR_NEXT, self.object_list[-1])
 
-    return results
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor_for(CURSOR_PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор по ключу из двух полей (дата, уникальный id) по убыванию.
+    Каждая страница - один запрос с LIMIT без OFFSET и без COUNT(*),
+    поэтому время ответа не зависит от глубины страницы. Общее число
+    объектов не считается; total - уже известное число, например
+    из счетчика, или None.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 total=None):
+        super().__init__(
+            object_list.order_by(*(f'-{field}' for field in ordering)),
+            per_page
+        )
+        self.ordering = ordering
+        self.total = total
+        self._has_next_page = False
+
+    def cursor_for(self, direction, obj):
+        return encode_cursor(direction, obj, self.ordering)
+
+    def first_page(self):
+        """
+        Первая страница - обычная Page с номером 1. Число страниц
+        для нее не считается: из лишней прочитанной строки известно
+        только, есть ли следующая (см. num_pages).
+        """
+        rows = list(self.object_list[:self.per_page + 1])
+        self._has_next_page = len(rows) > self.per_page
+        page = Page(rows[:self.per_page], 1, self)
+        page.previous_cursor = None
+        page.next_cursor = self.cursor_for(
+            CURSOR_NEXT, rows[self.per_page - 1]
+        ) if self._has_next_page else None
+        return page
+
+    @property
+    def num_pages(self):
+        return 2 if self._has_next_page else 1
+
+    def page_from_cursor(self, cursor):
+        direction, key, pk = decode_cursor(cursor)
+        key_lookup, pk_lookup = self.ordering
+        if direction == CURSOR_NEXT:
+            queryset = self._ordered(descending=True).filter(
+                Q(**{f'{key_lookup}__lt': key})
+                | Q(**{key_lookup: key, f'{pk_lookup}__lt': pk})
+            )
+        else:
+            queryset = self._ordered(descending=False).filter(
+                Q(**{f'{key_lookup}__gt': key})
+                | Q(**{key_lookup: key, f'{pk_lookup}__gt': pk})
+            )
+        rows = list(queryset[:self.per_page + 1])
+        if not rows:
+            return self.first_page()
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == CURSOR_NEXT:
+            return CursorPage(rows, self, has_next=has_more, has_previous=True)
+        rows.reverse()
+        return CursorPage(rows, self, has_next=True, has_previous=has_more)
+
+    def _ordered(self, descending):
+        prefix = '-' if descending else ''
+        return self.object_list.order_by(
+            *(f'{prefix}{field}' for field in self.ordering)
+        )
+
+
+def paginate(queryset, cursor, count=10, ordering=FEED_ORDERING,
+             total=None):
+    """
+    Функция для разбивки объектов запроса на страницы по курсору:
+    каждая страница, и первая тоже, - один запрос с LIMIT, без OFFSET
+    и без COUNT(*). Без курсора или с некорректным курсором - первая.
+    Общее число записей показывается, только если передан total.
+    """
+    paginator = CursorPaginator(
+        queryset, count, ordering=ordering, total=total
+    )
+    if cursor:
+        try:
+            return paginator.page_from_cursor(cursor)
+        except InvalidCursor:
+            pass
+    return paginator.first_page()
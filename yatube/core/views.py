@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import registry, template_profile
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -7,3 +13,22 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """
+    Метрики запросов в формате Prometheus для адресов из METRICS_IPS
+    с токеном METRICS_TOKEN в заголовке Authorization.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if (
+        not token
+        or request.META.get('REMOTE_ADDR') not in settings.METRICS_IPS
+        or not hmac.compare_digest(authorization, f'Bearer {token}')
+    ):
+        raise Http404
+    content = registry.render()
+    if settings.TEMPLATE_PROFILING:
+        content += template_profile.render()
+    return HttpResponse(content, content_type='text/plain; version=0.0.4')
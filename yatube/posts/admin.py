@@ -1,17 +1,33 @@
 from django.contrib import admin
 
+from .forms import PostForm
 from .models import Post, Group, Follow
+from .search import search_post_ids
+
+
+class PostAdminForm(PostForm):
+    """Форма админки с той же обработкой картинок, что и на сайте"""
+
+    class Meta(PostForm.Meta):
+        fields = '__all__'
 
 
 class PostAdmin(admin.ModelAdmin):
     """Класс кастомизации модели Post"""
 
+    form = PostAdminForm
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идет через полнотекстовый индекс, а не LIKE
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_post_ids(search_term)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """Класс кастомизации модели Post"""
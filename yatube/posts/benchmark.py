@@ -0,0 +1,490 @@
+import asyncio
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment,
+    teardown_test_environment
+)
+from django.urls import reverse
+from mixer.backend.django import mixer
+
+from core.asgi import WSGIToASGI, build_environ, run_wsgi
+from core.benchmark import summarize
+from core.metrics import profile_templates, template_profile
+from .models import Post, Group, Comment, Follow
+
+User = get_user_model()
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'post_create',
+)
+# Вью, на которых сравниваются WSGI и ASGI
+SERVER_VIEWS = ('index', 'group_posts', 'profile', 'follow_index')
+# Сколько первых страниц лент запрашивается в сценариях
+FEED_PAGES = 5
+# Курсор ссылки на следующую страницу в posts/includes/paginator.html
+NEXT_LINK = re.compile(r'href="\?cursor=([^"]+)">\s*Следующая')
+
+
+@contextmanager
+def temporary_database():
+    """Временная файловая база: замеры идут как в работе, а не в памяти"""
+    directory = tempfile.mkdtemp(prefix='yatube-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    test_settings['NAME'] = os.path.join(directory, 'db.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        os.rmdir(directory)
+
+
+def seed_data(users, groups, posts, comments, follows, seed=0):
+    """
+    Заполняет базу пользователями, группами, постами, комментариями
+    и подписками. При одном и том же seed данные совпадают.
+    """
+    rnd = random.Random(seed)
+    random.seed(seed)
+    mixer.faker.seed_instance(seed)
+    user_list = mixer.cycle(users).blend(
+        User, username=mixer.sequence('bench_user_{0}')
+    )
+    group_list = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('bench-group-{0}')
+    )
+    post_list = [
+        mixer.blend(
+            Post,
+            author=rnd.choice(user_list),
+            group=rnd.choice(group_list + [None]),
+            text=mixer.faker.text(),
+            # Иначе mixer сгенерирует картинки в настоящий MEDIA_ROOT
+            image=''
+        )
+        for _ in range(posts)
+    ]
+    for _ in range(comments):
+        mixer.blend(
+            Comment,
+            post=rnd.choice(post_list),
+            author=rnd.choice(user_list),
+            text=mixer.faker.sentence()
+        )
+    pairs = set()
+    while len(pairs) < min(follows, users * (users - 1)):
+        user, author = rnd.sample(user_list, 2)
+        pairs.add((user.pk, author.pk))
+    Follow.objects.bulk_create(
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in sorted(pairs)
+    )
+    return {
+        'users': users,
+        'groups': groups,
+        'posts': posts,
+        'comments': comments,
+        'follows': len(pairs),
+        'seed': seed,
+    }
+
+
+def feed_pages(client, url, pages=FEED_PAGES):
+    """
+    Параметры запросов первых pages страниц ленты. Курсоры берутся
+    из ссылок «Следующая», как их получает читатель.
+    """
+    data = [{}]
+    while len(data) < pages:
+        match = NEXT_LINK.search(client.get(url, data[-1]).content.decode())
+        if match is None:
+            break
+        data.append({'cursor': match.group(1)})
+    return data
+
+
+def api_pages(client, url, pages=FEED_PAGES, limit=10):
+    """То же для списка API: курсоры берутся из поля next ответа"""
+    data = [{'limit': limit}]
+    while len(data) < pages:
+        next_url = client.get(url, data[-1]).json()['next']
+        if next_url is None:
+            break
+        cursor = parse_qs(urlparse(next_url).query)['cursor'][0]
+        data.append({'limit': limit, 'cursor': cursor})
+    return data
+
+
+def _requests(view, rnd, client):
+    """
+    Бесконечный поток запросов (метод, url, данные) к вью. Ленты
+    запрашиваются со случайной из первых FEED_PAGES страниц, курсоры
+    к ним client собирает при первом запросе к ленте.
+    """
+    users = list(User.objects.values_list('username', flat=True))
+    groups = list(Group.objects.values_list('slug', 'pk'))
+    posts = list(Post.objects.values_list('pk', flat=True))
+    pages = {}
+
+    def page(url):
+        if url not in pages:
+            pages[url] = feed_pages(client, url)
+        return 'get', url, rnd.choice(pages[url])
+
+    while True:
+        if view == 'index':
+            yield page(reverse('posts:index'))
+        elif view == 'group_posts':
+            slug = rnd.choice(groups)[0]
+            yield page(reverse('posts:group_list', args=(slug,)))
+        elif view == 'profile':
+            username = rnd.choice(users)
+            yield page(reverse('posts:profile', args=(username,)))
+        elif view == 'post_detail':
+            post_id = rnd.choice(posts)
+            yield 'get', reverse('posts:post_detail', args=(post_id,)), {}
+        elif view == 'follow_index':
+            yield page(reverse('posts:follow_index'))
+        elif view == 'post_create':
+            yield 'post', reverse('posts:post_create'), {
+                'text': mixer.faker.text(),
+                'group': rnd.choice(groups)[1],
+            }
+
+
+def benchmark_view(client, view, requests, warmup=0, seed=0):
+    """
+    Выполняет warmup + requests запросов к вью и возвращает
+    пропускную способность, перцентили задержек и число SQL-запросов.
+    """
+    rnd = random.Random(seed)
+    stream = _requests(view, rnd, client)
+    cache.clear()
+    for _ in range(warmup):
+        method, url, data = next(stream)
+        getattr(client, method)(url, data)
+    latencies = []
+    queries = []
+    statuses = set()
+    for _ in range(requests):
+        method, url, data = next(stream)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(context.captured_queries))
+        statuses.add(response.status_code)
+    total = sum(latencies)
+    return {
+        'requests': requests,
+        'throughput_rps': round(requests / total, 1) if total else 0.0,
+        **summarize(latencies),
+        'queries_avg': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+        'statuses': sorted(statuses),
+    }
+
+
+def _reader():
+    """Пользователь с наибольшим числом подписок"""
+    return User.objects.annotate(
+        follows=Count('follower')
+    ).order_by('-follows', 'pk').first()
+
+
+def run_benchmark(views=VIEWS, requests=200, warmup=20, seed=0):
+    """Прогоняет сценарии всех вью от имени самого активного подписчика"""
+    client = _reader_client()
+    return {
+        view: benchmark_view(client, view, requests, warmup, seed)
+        for view in views
+    }
+
+
+def _reader_client():
+    client = Client()
+    client.force_login(_reader())
+    return client
+
+
+def _reader_cookie(client):
+    """Cookie сессии читателя для запросов в обход тестового клиента"""
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return f'{settings.SESSION_COOKIE_NAME}={session}'.encode()
+
+
+def _scope(url, data, cookie):
+    """HTTP-запрос GET в виде scope ASGI"""
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url,
+        'query_string': urlencode(data).encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie)],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+
+def _scopes(views, requests, seed):
+    """HTTP-запросы ASGI вперемешку ко всем вью от имени читателя"""
+    client = _reader_client()
+    cookie = _reader_cookie(client)
+    rnd = random.Random(seed)
+    streams = [_requests(view, rnd, client) for view in views]
+    scopes = []
+    for _ in range(requests):
+        _, url, data = next(rnd.choice(streams))
+        scopes.append(_scope(url, data, cookie))
+    return scopes
+
+
+def _report(latencies, statuses, total):
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / total, 1) if total else 0.0,
+        **summarize(latencies),
+        'statuses': sorted(statuses),
+    }
+
+
+def _close_connections(executor, workers):
+    """
+    Закрывает соединения с базой во всех потоках пула: барьер
+    не дает одному потоку выполнить две задачи.
+    """
+    barrier = threading.Barrier(workers)
+
+    def close():
+        barrier.wait()
+        connections.close_all()
+
+    for future in [executor.submit(close) for _ in range(workers)]:
+        future.result()
+
+
+def _call_wsgi(application, scope):
+    """Выполняет запрос в текущем потоке и возвращает статус ответа"""
+    messages = []
+    run_wsgi(application, build_environ(scope, BytesIO()), messages.append)
+    status, _ = messages[0]
+    return status
+
+
+def _serve_wsgi(application, scopes, clients):
+    """Потоковый WSGI-сервер: каждый клиент занимает свой поток"""
+    def handle(scope):
+        started = time.perf_counter()
+        status = _call_wsgi(application, scope)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(handle, scopes))
+        total = time.perf_counter() - started
+        _close_connections(executor, clients)
+    return _report(
+        [latency for latency, _ in results],
+        {status for _, status in results}, total
+    )
+
+
+def _serve_asgi(application, scopes, clients):
+    """Клиенты - сопрограммы в одном цикле событий"""
+    latencies = []
+    statuses = set()
+
+    async def client(queue):
+        while not queue.empty():
+            scope = queue.get_nowait()
+            sent = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                sent.append(message)
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            latencies.append(time.perf_counter() - started)
+            statuses.add(sent[0]['status'])
+
+    async def main():
+        queue = asyncio.Queue()
+        for scope in scopes:
+            queue.put_nowait(scope)
+        await asyncio.gather(*(client(queue) for _ in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return _report(latencies, statuses, time.perf_counter() - started)
+
+
+def run_server_benchmark(views=SERVER_VIEWS, requests=200, clients=8,
+                         workers=None, seed=0):
+    """
+    Прогоняет одни и те же запросы через WSGI-приложение в пуле
+    из clients потоков и через yatube.asgi с пулом из workers потоков.
+    """
+    workers = workers or clients
+    wsgi_application = get_wsgi_application()
+    asgi_application = WSGIToASGI(wsgi_application, workers)
+    scopes = _scopes(views, requests, seed)
+    results = {}
+    for name, serve, application in (
+        ('wsgi', _serve_wsgi, wsgi_application),
+        ('asgi', _serve_asgi, asgi_application),
+    ):
+        cache.clear()
+        results[name] = serve(application, scopes, clients)
+    _close_connections(asgi_application.executor, workers)
+    asgi_application.executor.shutdown()
+    return results
+
+
+def _profiled_pages():
+    """Страница каждого вида: лента, группа, профиль, пост, поиск"""
+    post = Post.objects.filter(group__isnull=False).first()
+    return {
+        'index': (reverse('posts:index'), {}),
+        'group_list': (
+            reverse('posts:group_list', args=(post.group.slug,)), {}
+        ),
+        'profile': (
+            reverse('posts:profile', args=(post.author.username,)), {}
+        ),
+        'post_detail': (reverse('posts:post_detail', args=(post.pk,)), {}),
+        'follow_index': (reverse('posts:follow_index'), {}),
+        'search': (reverse('posts:search'), {'q': post.text.split()[0]}),
+        'about': (reverse('about:author'), {}),
+    }
+
+
+def run_template_profile(requests=50, cold=False):
+    """
+    Запрашивает каждую страницу requests раз и возвращает время
+    шаблонов на запрос: {страница: [строки отчета template_profile]}.
+    С cold=True кеш очищается перед каждым запросом, и фрагменты
+    {% cache %} рендерятся каждый раз.
+    """
+    profile_templates()
+    application = get_wsgi_application()
+    cookie = _reader_cookie(_reader_client())
+    results = {}
+    for page, (url, data) in _profiled_pages().items():
+        scope = _scope(url, data, cookie)
+        cache.clear()
+        template_profile.reset()
+        for _ in range(requests):
+            if cold:
+                cache.clear()
+            _call_wsgi(application, scope)
+        results[page] = [
+            {
+                **row,
+                'renders': row['renders'] / requests,
+                'total_ms': round(row['total_ms'] / requests, 3),
+                'own_ms': round(row['own_ms'] / requests, 3),
+            }
+            for row in template_profile.report()
+        ]
+    return results
+
+
+def _api_pages():
+    """Пары (HTML-страница, тот же список в API) для каждой ленты"""
+    post = Post.objects.filter(group__isnull=False).first()
+    group, username = post.group.slug, post.author.username
+    return {
+        'index': (reverse('posts:index'), reverse('api:posts')),
+        'group_posts': (
+            reverse('posts:group_list', args=(group,)),
+            reverse('api:group_posts', args=(group,)),
+        ),
+        'profile': (
+            reverse('posts:profile', args=(username,)),
+            reverse('api:user_posts', args=(username,)),
+        ),
+        'follow_index': (
+            reverse('posts:follow_index'), reverse('api:follow_posts')
+        ),
+    }
+
+
+def _measure(client, url, data, requests, warmup):
+    for _ in range(warmup):
+        client.get(url, data)
+    size = 0
+    started = time.process_time()
+    for _ in range(requests):
+        size += len(client.get(url, data).content)
+    cpu = time.process_time() - started
+    return {
+        'cpu_ms': round(cpu / requests * 1000, 3),
+        'bytes': size // requests,
+    }
+
+
+def _compare(client, html_url, html_data, api_url, api_data, requests,
+             warmup):
+    html = _measure(client, html_url, html_data, requests, warmup)
+    api = _measure(client, api_url, api_data, requests, warmup)
+    return {
+        'html': html,
+        'api': api,
+        'cpu_ratio': round(html['cpu_ms'] / api['cpu_ms'], 1)
+        if api['cpu_ms'] else None,
+        'bytes_ratio': round(html['bytes'] / api['bytes'], 1)
+        if api['bytes'] else None,
+    }
+
+
+def run_api_benchmark(requests=200, warmup=20):
+    """
+    Процессорное время и размер ответа на запрос для первой и самой
+    дальней из FEED_PAGES страниц каждой ленты в HTML и в API: строки
+    'index' и, например, 'index:5'. API запрашивается с тем же числом
+    постов на странице, что и HTML.
+    """
+    client = _reader_client()
+    cache.clear()
+    results = {}
+    for page, (html_url, api_url) in _api_pages().items():
+        html_pages = feed_pages(client, html_url)
+        api_data = api_pages(client, api_url, len(html_pages))
+        results[page] = _compare(
+            client, html_url, html_pages[0], api_url, api_data[0],
+            requests, warmup
+        )
+        depth = min(len(html_pages), len(api_data))
+        if depth > 1:
+            results[f'{page}:{depth}'] = _compare(
+                client, html_url, html_pages[depth - 1], api_url,
+                api_data[depth - 1], requests, warmup
+            )
+    return results
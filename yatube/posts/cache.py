@@ -0,0 +1,103 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.middleware.csrf import get_token
+
+INDEX = 'index'
+GROUP = 'group'
+PROFILE = 'profile'
+POST = 'post'
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+POPULAR = 'popular'
+
+
+def _version_key(scope):
+    return 'feed_version:' + ':'.join(str(part) for part in scope)
+
+
+def get_version(*scope):
+    """
+    Текущая версия кеша ленты, например ('group', 3).
+    Версия входит в ключ фрагмента, поэтому после ее смены старые
+    фрагменты больше не читаются и вытесняются по TTL.
+    """
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Версия от времени не совпадет с версией, вытесненной из кеша
+        version = int(time.time() * 1000)
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(*scope):
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def is_shared_cache():
+    """
+    Видят ли все процессы одни и те же версии. У locmem кеш свой
+    в каждом процессе: правка в одном воркере не меняет версии
+    в остальных, а dummy версии не хранит вовсе.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def feed_cache(*scope):
+    """Контекст для {% cache cache_timeout ... cache_version %}"""
+    return {
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'cache_version': get_version(*scope),
+    }
+
+
+def page_etag(request, *scopes, csrf=False):
+    """
+    ETag страницы без ее рендеринга: версии показанных на ней лент,
+    пользователь (шапка и кнопки зависят от него), параметры запроса
+    и версия кода из ETAG_RELEASE. Без общего кеша возвращает None:
+    другие воркеры не узнают о правке и отвечали бы 304 бессрочно.
+    С csrf в ETag входит CSRF-cookie пользователя: login() ее меняет,
+    и браузер не покажет сохраненную форму со старым токеном.
+    """
+    if not is_shared_cache():
+        return None
+    parts = [
+        settings.ETAG_RELEASE, request.user.pk, request.GET.urlencode()
+    ]
+    if csrf and request.user.is_authenticated:
+        # get_token создает cookie, если ее еще нет, и тот же токен
+        # попадет в форму страницы
+        get_token(request)
+        parts.append(request.META['CSRF_COOKIE'])
+    parts += [
+        ':'.join(map(str, scope)) + f'={get_version(*scope)}'
+        for scope in scopes
+    ]
+    return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def invalidate_post(post, previous=None):
+    """Сбрасывает все ленты и страницы, на которых показан пост"""
+    bump_version(INDEX)
+    bump_version(POPULAR)
+    bump_version(POST, post.pk)
+    authors = {post.author_id}
+    groups = {post.group_id}
+    if previous is not None:
+        authors.add(previous[0])
+        groups.add(previous[1])
+    for author_id in authors:
+        bump_version(PROFILE, author_id)
+    for group_id in groups - {None}:
+        bump_version(GROUP, group_id)
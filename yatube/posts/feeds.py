@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.db.models import F, FilteredRelation, Q
+
+from core.utils import FEED_ORDERING
+from .models import Post, Follow, FeedEntry
+from .stats import get_user_stats
+
+PUSH_MODE = 'push'
+BATCH_SIZE = 500
+INBOX_ORDERING = ('feed_date', 'feed_post')
+
+
+def is_push_mode():
+    return settings.FOLLOW_FEED_MODE == PUSH_MODE
+
+
+def is_popular(author_id):
+    """
+    Больше ли у автора подписчиков, чем FOLLOW_FEED_PUSH_THRESHOLD.
+    Посты популярных авторов не рассылаются, а читаются при запросе
+    ленты. Счетчик читается из UserStats, а не из кеша, поэтому
+    переход через порог виден сразу во всех процессах.
+    """
+    followers = get_user_stats(author_id)['follower_count']
+    return followers > settings.FOLLOW_FEED_PUSH_THRESHOLD
+
+
+def _bulk_add(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты подписчиков автора"""
+    if not is_push_mode() or is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True
+    )
+    _bulk_add(
+        FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill_follow(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора"""
+    if not is_push_mode() or is_popular(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    _bulk_add(
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def reconcile_popular_author(author_id, delta):
+    """
+    Вызывается после изменения числа подписчиков автора на delta.
+    Если автор стал популярным, его посты убираются из лент
+    подписчиков: дальше они читаются при запросе. Если перестал -
+    его посты, в том числе опубликованные, пока он был популярным,
+    раскладываются по лентам всех подписчиков. Одновременные подписки
+    могут перескочить порог незамеченными; ленты тогда восстанавливает
+    rebuild_follow_feeds.
+    """
+    if not is_push_mode():
+        return
+    followers = get_user_stats(author_id)['follower_count']
+    threshold = settings.FOLLOW_FEED_PUSH_THRESHOLD
+    if delta > 0 and followers == threshold + 1:
+        FeedEntry.objects.filter(post__author_id=author_id).delete()
+    elif delta < 0 and followers == threshold:
+        posts = list(
+            Post.objects.filter(author_id=author_id).values_list(
+                'pk', 'pub_date'
+            )
+        )
+        users = Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        )
+        _bulk_add(
+            FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id in users.iterator()
+            for post_id, pub_date in posts
+        )
+
+
+def prune_follow(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки"""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild_follow_feeds():
+    """Заново раскладывает посты по лентам всех подписчиков"""
+    FeedEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        backfill_follow(user_id, author_id)
+
+
+def follow_feed(user):
+    """
+    Возвращает посты ленты подписок пользователя и поля сортировки
+    для paginate(). В режиме 'push' лента читается из FeedEntry по
+    индексу, посты популярных авторов добавляются при запросе.
+    """
+    following = Follow.objects.filter(user=user).values('author')
+    if not is_push_mode():
+        return Post.objects.filter(author__in=following), FEED_ORDERING
+
+    pulled = list(
+        following.filter(
+            author__stats__follower_count__gt=(
+                settings.FOLLOW_FEED_PUSH_THRESHOLD
+            )
+        ).values_list('author', flat=True)
+    )
+    if pulled:
+        inbox = FeedEntry.objects.filter(user=user).values('post')
+        post_list = Post.objects.filter(
+            Q(pk__in=inbox) | Q(author__in=pulled)
+        )
+        return post_list, FEED_ORDERING
+
+    post_list = Post.objects.annotate(
+        entry=FilteredRelation(
+            'feed_entries', condition=Q(feed_entries__user=user)
+        ),
+        feed_date=F('entry__pub_date'),
+        feed_post=F('entry__post_id'),
+    ).filter(feed_date__isnull=False)
+    return post_list, INBOX_ORDERING
@@ -1,5 +1,10 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
 
+from .images import ProcessedImage, process_image
 from .models import Post, Comment
 
 
@@ -8,6 +13,33 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def clean_image(self):
+        """Проверяет размеры загруженной картинки и перекодирует ее"""
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                'Файл больше %s.'
+                % filesizeformat(settings.POST_IMAGE_MAX_UPLOAD_SIZE)
+            )
+        width, height = image.image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError('Слишком большое изображение.')
+        try:
+            return process_image(image)
+        except (OSError, Image.DecompressionBombError):
+            raise forms.ValidationError('Не удалось обработать изображение.')
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            image = self.cleaned_data['image']
+            processed = isinstance(image, ProcessedImage)
+            self.instance.image_width = image.width if processed else None
+            self.instance.image_height = image.height if processed else None
+            self.instance.image_size = image.size if processed else None
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
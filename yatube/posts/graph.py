@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .cache import FOLLOWING, get_version, is_shared_cache
+from .models import Follow
+
+
+class LRUCache:
+    """Словарь в памяти процесса, вытесняющий давно не читанные ключи"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# user_id -> (версия FOLLOWING, frozenset id авторов). Версия меняется
+# при подписке и отписке; устаревший набор не читается, только если
+# кеш общий для всех процессов (см. is_shared_cache). С locmem версия
+# своя у каждого воркера, поэтому LRU тогда не используется.
+following_cache = LRUCache(settings.FOLLOWING_CACHE_SIZE)
+
+
+def _load_following(user_id):
+    return frozenset(
+        Follow.objects.filter(user_id=user_id).values_list(
+            'author_id', flat=True
+        )
+    )
+
+
+def following_set(user_id):
+    """
+    Множество id авторов, на которых подписан пользователь.
+    Без общего кеша каждый раз читается из базы.
+    """
+    if not is_shared_cache():
+        return _load_following(user_id)
+    version = get_version(FOLLOWING, user_id)
+    cached = following_cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    authors = _load_following(user_id)
+    following_cache.set(user_id, (version, authors))
+    return authors
+
+
+def is_following(user, author_id):
+    """Подписан ли пользователь на автора; без запроса к базе из кеша"""
+    return user.is_authenticated and author_id in following_set(user.pk)
@@ -0,0 +1,68 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Расширения файлов для форматов, в которые перекодируются картинки
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+class ProcessedImage(ContentFile):
+    """Перекодированная картинка с ее размерами"""
+
+    def __init__(self, content, name, width, height):
+        super().__init__(content, name=name)
+        self.width = width
+        self.height = height
+
+
+def process_image(upload):
+    """
+    Уменьшает картинку до POST_IMAGE_MAX_SIZE, поворачивает по EXIF
+    и перекодирует в POST_IMAGE_FORMAT без метаданных.
+    """
+    max_size = settings.POST_IMAGE_MAX_SIZE
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе,
+        # полный кадр телефонной фотографии в память не попадает
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        image_format = settings.POST_IMAGE_FORMAT
+        if image_format == 'JPEG':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        output = BytesIO()
+        # EXIF в новый файл не передается, поэтому метаданные
+        # (в том числе координаты съемки) не попадают на сайт
+        image.save(
+            output, image_format,
+            quality=settings.POST_IMAGE_QUALITY, optimize=True
+        )
+        width, height = image.size
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    name = f'{stem}.{EXTENSIONS[image_format]}'
+    return ProcessedImage(output.getvalue(), name, width, height)
+
+
+def reprocess_post_image(post):
+    """
+    Перекодирует уже сохраненную картинку поста. Оригинал удаляется
+    сигналом, если на него не ссылаются другие посты.
+    Возвращает экономию места в байтах.
+    """
+    original = post.image.name
+    storage = post.image.storage
+    with storage.open(original) as source:
+        source_size = source.size
+        processed = process_image(source)
+    post.image.save(processed.name, processed, save=False)
+    post.image_width = processed.width
+    post.image_height = processed.height
+    post.image_size = processed.size
+    post.save()
+    return source_size - processed.size
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import run_api_benchmark, seed_data, temporary_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает процессорное время и размер ответа HTML-лент '
+        'и тех же списков в JSON API на временной базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            seed_data(
+                users=50, groups=5, posts=options['posts'],
+                comments=options['posts'], follows=200
+            )
+            results = run_api_benchmark(
+                options['requests'], options['warmup']
+            )
+
+        for page, row in results.items():
+            self.stdout.write(
+                f"{page:>12}  html {row['html']['cpu_ms']} ms "
+                f"{row['html']['bytes']} B  api {row['api']['cpu_ms']} ms "
+                f"{row['api']['bytes']} B  cpu x{row['cpu_ratio']}  "
+                f"bytes x{row['bytes_ratio']}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,66 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import (
+    SERVER_VIEWS, seed_data, run_server_benchmark, temporary_database
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность лент через WSGI и '
+        'yatube.asgi при одновременных клиентах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument(
+            '--workers', type=int,
+            help='Потоки ASGI, по умолчанию столько же, сколько клиентов'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--views', nargs='+', choices=SERVER_VIEWS,
+            default=list(SERVER_VIEWS)
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['groups'] < 1:
+            raise CommandError('Нужно не меньше 2 пользователей и 1 группы')
+        with temporary_database():
+            dataset = seed_data(
+                options['users'], options['groups'], options['posts'],
+                0, options['follows'], options['seed']
+            )
+            results = run_server_benchmark(
+                options['views'], options['requests'], options['clients'],
+                options['workers'], options['seed']
+            )
+
+        for server, row in results.items():
+            self.stdout.write(
+                f"{server:>5}  {row['throughput_rps']:>7} rps  "
+                f"p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  "
+                f"p99 {row['p99_ms']} ms  statuses {row['statuses']}"
+            )
+        if options['output']:
+            report = {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'dataset': dataset,
+                'clients': options['clients'],
+                'servers': results,
+            }
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,66 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import (
+    VIEWS, seed_data, run_benchmark, temporary_database
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную базу тестовыми данными и измеряет '
+        'пропускную способность, задержки и число запросов вью posts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=list(VIEWS)
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['groups'] < 1:
+            raise CommandError('Нужно не меньше 2 пользователей и 1 группы')
+        with temporary_database():
+            started = time.perf_counter()
+            dataset = seed_data(
+                options['users'], options['groups'], options['posts'],
+                options['comments'], options['follows'], options['seed']
+            )
+            self.stdout.write(
+                f'Данные созданы за {time.perf_counter() - started:.1f} с'
+            )
+            results = run_benchmark(
+                options['views'], options['requests'], options['warmup'],
+                options['seed']
+            )
+
+        for view, row in results.items():
+            self.stdout.write(
+                f"{view:>12}  {row['throughput_rps']:>7} rps  "
+                f"p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  "
+                f"p99 {row['p99_ms']} ms  "
+                f"queries {row['queries_avg']} (max {row['queries_max']})"
+            )
+        if options['output']:
+            report = {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'dataset': dataset,
+                'views': results,
+            }
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
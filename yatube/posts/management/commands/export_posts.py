@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (
+    CHUNK_SIZE, CSV, FORMATS, JSONL, export_records, write_records
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии и подписки в JSON Lines или CSV. '
+        'Строки читаются из базы порциями, память не растет с объемом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Файл или '-' для stdout")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='По умолчанию определяется по расширению файла'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['output']
+        file_format = options['format'] or (
+            CSV if path.endswith('.csv') else JSONL
+        )
+        records = export_records(options['chunk_size'])
+        if path == '-':
+            count = write_records(records, self.stdout, file_format)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as output:
+                count = write_records(records, output, file_format)
+        self.stderr.write(self.style.SUCCESS(f'Выгружено записей: {count}'))
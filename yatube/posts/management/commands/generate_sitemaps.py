@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import generate_sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает карту сайта: индекс и gzip-шарды постов, профилей '
+        'и групп. Перезаписываются только изменившиеся шарды'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', default=settings.SITEMAP_ROOT)
+        parser.add_argument(
+            '--base-url', default=settings.SITEMAP_BASE_URL,
+            help='Адрес сайта для ссылок, например https://example.com'
+        )
+        parser.add_argument(
+            '--shard-size', type=int, default=settings.SITEMAP_SHARD_SIZE
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Перечитать все шарды, например после переименования '
+                 'пользователей или групп'
+        )
+
+    def handle(self, *args, **options):
+        result = generate_sitemaps(
+            options['root'], options['base_url'], options['shard_size'],
+            full=options['full']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Шарды: записано {len(result['written'])}, "
+            f"без изменений {len(result['unchanged'])}, "
+            f"удалено {len(result['removed'])}"
+        ))
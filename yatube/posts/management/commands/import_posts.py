@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (
+    BATCH_SIZE, CSV, FORMATS, JSONL, finish_import, import_records,
+    read_records
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии и подписки из выгрузки '
+        'export_posts. Авторы и группы ищутся по username и slug и '
+        'должны уже быть в базе; файлы картинок копируются отдельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Файл или '-' для stdin")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='По умолчанию определяется по расширению файла'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Процессы, параллельно сохраняющие пачки записей'
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        file_format = options['format'] or (
+            CSV if path.endswith('.csv') else JSONL
+        )
+        try:
+            if path == '-':
+                stats = self.load(sys.stdin, file_format, options)
+            else:
+                with open(path, encoding='utf-8', newline='') as source:
+                    stats = self.load(source, file_format, options)
+        except (ValueError, KeyError) as error:
+            raise CommandError(f'Некорректная запись: {error}')
+        finish_import()
+        for kind, (imported, skipped) in stats.items():
+            self.stdout.write(
+                f'{kind}: сохранено {imported}, пропущено {skipped}'
+            )
+        self.stdout.write(self.style.SUCCESS('Импорт завершен'))
+
+    @staticmethod
+    def load(source, file_format, options):
+        return import_records(
+            read_records(source, file_format),
+            options['batch_size'], options['workers']
+        )
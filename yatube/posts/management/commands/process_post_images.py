@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts.images import reprocess_post_image
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Уменьшает и перекодирует картинки постов, загруженные раньше'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(image_width=None)
+        processed = saved = 0
+        for post in posts.iterator():
+            try:
+                saved += reprocess_post_image(post)
+            except OSError as error:
+                self.stderr.write(f'Пост {post.pk}: {error}')
+                continue
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {processed}, '
+            f'освобождено {filesizeformat(saved)}'
+        ))
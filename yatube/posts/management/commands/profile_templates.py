@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import (
+    run_template_profile, seed_data, temporary_database
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Рендерит каждую страницу N раз на временной базе и выводит '
+        'шаблоны по убыванию собственного времени рендеринга. Для '
+        'цифр как в работе: --settings=yatube.settings_production'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            seed_data(
+                users=20, groups=3, posts=options['posts'],
+                comments=options['posts'], follows=40
+            )
+            results = run_template_profile(
+                options['requests'], options['cold']
+            )
+
+        for page, rows in results.items():
+            total = max((row['total_ms'] for row in rows), default=0)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{page}: {total:.2f} ms шаблонов на запрос'
+            ))
+            for row in rows[:options['top']]:
+                share = row['own_ms'] / total * 100 if total else 0
+                self.stdout.write(
+                    f"  {row['own_ms']:>8.3f} ms {share:>5.1f}%  "
+                    f"x{row['renders']:<5g} {row['template']}"
+                )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.feeds import rebuild_follow_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново раскладывает посты по лентам подписок '
+        '(нужно после переключения FOLLOW_FEED_MODE на push)'
+    )
+
+    def handle(self, *args, **options):
+        rebuild_follow_feeds()
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild_follow_counts, rebuild_post_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики публикаций, подписчиков и подписок'
+
+    def handle(self, *args, **options):
+        authors = rebuild_post_counts()
+        self.stdout.write(
+            self.style.SUCCESS(f'Счетчики пересчитаны для {authors} авторов')
+        )
+        users = rebuild_follow_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счетчики подписок пересчитаны для {users} пользователей'
+        ))
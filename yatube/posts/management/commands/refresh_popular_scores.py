@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.popular import refresh_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги постов для ленты популярного. Запускается '
+        'периодически: комментарии учитываются сразу, а изменения числа '
+        'подписчиков - только при пересчете'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = refresh_scores(options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Рейтинги пересчитаны для {total} постов')
+        )
@@ -0,0 +1,50 @@
+import sqlite3
+
+from django.db import migrations
+
+# Копия posts.search.FTS_TABLE на момент миграции: код приложения
+# может меняться, а миграция должна выполняться так же, как раньше.
+FTS_TABLE = 'posts_post_fts'
+
+
+def use_fts(connection):
+    """SQLite с модулем FTS5, как posts.search.use_fts"""
+    if connection.vendor != 'sqlite':
+        return False
+    try:
+        sqlite3.connect(':memory:').execute(
+            'CREATE VIRTUAL TABLE fts5_check USING fts5(text)'
+        )
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    if not use_fts(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+        'USING fts5(text, group_title)'
+    )
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, text, group_title) '
+        "SELECT p.id, p.text, COALESCE(g.title, '') FROM posts_post p "
+        'LEFT JOIN posts_group g ON g.id = p.group_id'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if use_fts(schema_editor.connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
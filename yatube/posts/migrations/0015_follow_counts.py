@@ -0,0 +1,60 @@
+from django.db import migrations, models
+from django.db.models import Count
+import django.utils.timezone
+
+
+def fill_follow_counts(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    followers = dict(
+        Follow.objects.values_list('author').annotate(
+            count=Count('pk')
+        ).order_by()
+    )
+    following = dict(
+        Follow.objects.values_list('user').annotate(
+            count=Count('pk')
+        ).order_by()
+    )
+    # Строки без счетчиков создаются при первом обращении
+    for stats in UserStats.objects.filter(
+        user_id__in=set(followers) | set(following)
+    ):
+        stats.follower_count = followers.get(stats.user_id, 0)
+        stats.following_count = following.get(stats.user_id, 0)
+        stats.save(update_fields=['follower_count', 'following_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата подписки'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество подписок'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', '-created', '-id'], name='follow_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user', '-created', '-id'], name='follow_user_created_idx'),
+        ),
+        migrations.RunPython(fill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,134 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from .cache import POPULAR, bump_version
+from .models import Post, Comment, Follow
+from .stats import get_user_stats
+
+# Начало отсчета времени для рейтинга
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+CHUNK_SIZE = 2000
+
+
+def _hours(moment):
+    return (moment - EPOCH).total_seconds() / 3600 / \
+        settings.POPULAR_HALF_LIFE_HOURS
+
+
+def _log2_add(a, b):
+    """log2(2 ** a + 2 ** b) без переполнения"""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def compute_score(pub_date, comment_dates, followers):
+    """
+    Рейтинг - log2 суммы вкладов поста и его комментариев, где вклад
+    удваивается каждые POPULAR_HALF_LIFE_HOURS часов от EPOCH.
+    Это то же, что затухание всех вкладов со временем, но сохраненный
+    рейтинг не устаревает: свежие комментарии (скорость обсуждения)
+    весят больше старых, а старый пост опускается ниже новых без
+    пересчета. Подписчики автора увеличивают вклад самого поста.
+    """
+    weight = 1 + settings.POPULAR_FOLLOWER_WEIGHT * math.log2(1 + followers)
+    score = _hours(pub_date) + math.log2(weight)
+    comment_weight = math.log2(settings.POPULAR_COMMENT_WEIGHT)
+    for created in comment_dates:
+        score = _log2_add(score, _hours(created) + comment_weight)
+    return score
+
+
+def score_new_post(post):
+    """
+    Рейтинг нового поста до его сохранения: комментариев еще нет,
+    а pub_date будет заполнена тем же моментом с точностью до
+    миллисекунд, поэтому отдельный UPDATE после вставки не нужен.
+    """
+    post.score = compute_score(
+        timezone.now(), (),
+        get_user_stats(post.author_id)['follower_count']
+    )
+
+
+def add_comment_score(comment):
+    """
+    Добавляет к рейтингу поста вклад нового комментария без чтения
+    остальных. При одновременных комментариях вклад одного может
+    потеряться до следующего refresh_scores.
+    """
+    score = Post.objects.filter(pk=comment.post_id).values_list(
+        'score', flat=True
+    ).first()
+    if score is None:
+        return
+    score = _log2_add(
+        score,
+        _hours(comment.created)
+        + math.log2(settings.POPULAR_COMMENT_WEIGHT)
+    )
+    Post.objects.filter(pk=comment.post_id).update(score=score)
+    bump_version(POPULAR)
+
+
+def update_post_score(post_id):
+    """Пересчитывает рейтинг поста, например после удаления комментария"""
+    post = Post.objects.filter(pk=post_id).values_list(
+        'pub_date', 'author_id'
+    ).first()
+    if post is None:
+        return
+    pub_date, author_id = post
+    score = compute_score(
+        pub_date,
+        Comment.objects.filter(post_id=post_id).values_list(
+            'created', flat=True
+        ).iterator(),
+        Follow.objects.filter(author_id=author_id).count()
+    )
+    Post.objects.filter(pk=post_id).update(score=score)
+    bump_version(POPULAR)
+
+
+def refresh_scores(chunk_size=CHUNK_SIZE):
+    """
+    Пересчитывает рейтинги всех постов по chunk_size за раз, например
+    после изменения числа подписчиков. Возвращает число постов.
+    """
+    followers = dict(
+        Follow.objects.values_list('author').annotate(
+            count=Count('pk')
+        ).order_by()
+    )
+    total = 0
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'pub_date', 'author_id'
+            )[:chunk_size]
+        )
+        if not posts:
+            break
+        last_pk = posts[-1][0]
+        comments = {}
+        for post_id, created in Comment.objects.filter(
+            post_id__gte=posts[0][0], post_id__lte=last_pk
+        ).values_list('post_id', 'created').iterator():
+            comments.setdefault(post_id, []).append(created)
+        Post.objects.bulk_update(
+            [
+                Post(pk=pk, score=compute_score(
+                    pub_date, comments.get(pk, ()),
+                    followers.get(author_id, 0)
+                ))
+                for pk, pub_date, author_id in posts
+            ],
+            ['score']
+        )
+        total += len(posts)
+    bump_version(POPULAR)
+    return total
@@ -0,0 +1,245 @@
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.db import connection, connections, router
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+ADMIN_RESULTS_LIMIT = 1000
+
+
+def tokenize(text):
+    return [word.lower() for word in WORD.findall(text or '')]
+
+
+class FTSIndex:
+    """Индекс в виртуальной таблице SQLite FTS5, rowid = id поста"""
+
+    @staticmethod
+    def _match(query):
+        # Слова запроса ищутся по префиксу и объединяются через AND;
+        # кавычки не дают пользователю сломать синтаксис FTS5.
+        return ' '.join(f'"{word}"*' for word in tokenize(query))
+
+    def add(self, post_id, text, group_title):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, group_title) '
+                'VALUES (%s, %s, %s)',
+                [post_id, text, group_title or '']
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def set_group_title(self, group_id, group_title):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {FTS_TABLE} SET group_title = %s WHERE rowid IN '
+                '(SELECT id FROM posts_post WHERE group_id = %s)',
+                [group_title or '', group_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, group_title) '
+                "SELECT p.id, p.text, COALESCE(g.title, '') "
+                'FROM posts_post p '
+                'LEFT JOIN posts_group g ON g.id = p.group_id'
+            )
+
+    @staticmethod
+    def _reader():
+        # Сырой SQL не проходит через роутер, реплику выбираем сами
+        return connections[router.db_for_read(Post)]
+
+    def count(self, query):
+        match = self._match(query)
+        if not match:
+            return 0
+        with self._reader().cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [match]
+            )
+            return cursor.fetchone()[0]
+
+    def ids(self, query, offset=0, limit=None):
+        match = self._match(query)
+        if not match:
+            return []
+        with self._reader().cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [match, -1 if limit is None else limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PythonIndex:
+    """
+    Инвертированный индекс в памяти процесса для баз без FTS5.
+    Строится при первом поиске и обновляется сигналами этого процесса.
+    """
+
+    def __init__(self):
+        self._postings = None
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def _build(self):
+        self._postings = defaultdict(dict)
+        posts = Post.objects.values_list('pk', 'text', 'group__title')
+        for post_id, text, group_title in posts.iterator():
+            self._add(post_id, text, group_title)
+
+    def _ensure_built(self):
+        if self._postings is None:
+            self._build()
+
+    def _add(self, post_id, text, group_title):
+        words = tokenize(text) + tokenize(group_title)
+        self._documents[post_id] = set(words)
+        for word in words:
+            postings = self._postings[word]
+            postings[post_id] = postings.get(post_id, 0) + 1
+
+    def _remove(self, post_id):
+        for word in self._documents.pop(post_id, ()):
+            self._postings[word].pop(post_id, None)
+
+    def add(self, post_id, text, group_title):
+        with self._lock:
+            if self._postings is not None:
+                self._remove(post_id)
+                self._add(post_id, text, group_title)
+
+    def remove(self, post_id):
+        with self._lock:
+            if self._postings is not None:
+                self._remove(post_id)
+
+    def set_group_title(self, group_id, group_title):
+        # Индекс в памяти дешевле собрать заново при следующем поиске
+        self.rebuild()
+
+    def rebuild(self):
+        with self._lock:
+            self._postings = None
+            self._documents = {}
+
+    def _ranked(self, query):
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            self._ensure_built()
+            scores = None
+            for word in words:
+                matched = defaultdict(int)
+                for token, postings in self._postings.items():
+                    if token.startswith(word):
+                        for post_id, frequency in postings.items():
+                            matched[post_id] += frequency
+                if scores is None:
+                    scores = matched
+                else:
+                    scores = {
+                        post_id: score + matched[post_id]
+                        for post_id, score in scores.items()
+                        if post_id in matched
+                    }
+        return sorted(scores, key=lambda pk: (-scores[pk], -pk))
+
+    def count(self, query):
+        return len(self._ranked(query))
+
+    def ids(self, query, offset=0, limit=None):
+        ranked = self._ranked(query)
+        stop = None if limit is None else offset + limit
+        return ranked[offset:stop]
+
+
+_fts_index = FTSIndex()
+_python_index = PythonIndex()
+
+
+@lru_cache(maxsize=None)
+def fts5_supported():
+    try:
+        sqlite3.connect(':memory:').execute(
+            'CREATE VIRTUAL TABLE fts5_check USING fts5(text)'
+        )
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def use_fts(db=connection):
+    # Миграция 0011 создает таблицу индекса при этом же условии
+    return db.vendor == 'sqlite' and fts5_supported()
+
+
+def get_index():
+    return _fts_index if use_fts() else _python_index
+
+
+class SearchResults:
+    """
+    Найденные посты в порядке релевантности. Поддерживает count() и
+    срезы, поэтому подходит для django.core.paginator.Paginator.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self._index = get_index()
+
+    def count(self):
+        return self._index.count(self.query)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        limit = None if item.stop is None else item.stop - start
+        ids = self._index.ids(self.query, start, limit)
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def search_post_ids(query, limit=ADMIN_RESULTS_LIMIT):
+    return get_index().ids(query, 0, limit)
+
+
+def index_post(post):
+    group_title = post.group.title if post.group_id else ''
+    get_index().add(post.pk, post.text, group_title)
+
+
+def unindex_post(post_id):
+    get_index().remove(post_id)
+
+
+def reindex_group(group_id, group_title):
+    get_index().set_group_title(group_id, group_title)
+
+
+def rebuild_index():
+    """Заново строит поисковый индекс по всем постам"""
+    get_index().rebuild()
+    return Post.objects.count()
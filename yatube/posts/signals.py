@@ -0,0 +1,131 @@
+import threading
+
+from django.db.models.signals import (
+    pre_save, post_save, pre_delete, post_delete
+)
+from django.dispatch import receiver
+
+from .cache import (
+    INDEX, GROUP, POST, FOLLOWING, FOLLOWERS, bump_version, invalidate_post
+)
+from .feeds import (
+    fan_out_post, backfill_follow, prune_follow, reconcile_popular_author
+)
+from .models import Post, Group, Comment, Follow
+from .popular import add_comment_score, score_new_post, update_post_score
+from .search import index_post, unindex_post, reindex_group
+from .stats import change_follow_counts, change_post_count
+from .thumbnails import release_image, schedule_thumbnails
+
+# id постов, которые сейчас удаляются вместе с комментариями
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_author(sender, instance, **kwargs):
+    """Запоминает прежних автора, группу и картинку поста"""
+    instance._previous = None
+    if instance.pk is not None:
+        instance._previous = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('author_id', 'group_id', 'image').first()
+
+
+@receiver(pre_save, sender=Post)
+def score_added_post(sender, instance, raw=False, **kwargs):
+    if instance._state.adding and not raw:
+        score_new_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    invalidate_post(instance, previous)
+    if instance.image and (previous is None or previous[2] != instance.image):
+        schedule_thumbnails(instance.image.name, instance.pk)
+    if previous is not None and previous[2] != instance.image:
+        release_image(previous[2])
+    index_post(instance)
+    if created:
+        change_post_count(instance.author_id, 1)
+        fan_out_post(instance)
+    elif previous is not None and previous[0] != instance.author_id:
+        change_post_count(previous[0], -1)
+        change_post_count(instance.author_id, 1)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post(sender, instance, **kwargs):
+    # Каскад удаляет комментарии раньше поста: пересчитывать
+    # рейтинг поста после каждого из них незачем
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    invalidate_post(instance)
+    unindex_post(instance.pk)
+    release_image(instance.image.name)
+    change_post_count(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Group)
+def reindex_group_posts(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        reindex_group(instance.pk, instance.title)
+        bump_version(GROUP, instance.pk)
+        bump_version(INDEX)
+
+
+@receiver(pre_delete, sender=Group)
+def unindex_group_posts(sender, instance, **kwargs):
+    # Посты остаются без группы, а SET_NULL не вызывает их сигналы
+    reindex_group(instance.pk, '')
+    bump_version(INDEX)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_saved_comment_post(sender, instance, created, raw=False,
+                                  **kwargs):
+    if raw:
+        return
+    bump_version(POST, instance.post_id)
+    if created:
+        add_comment_score(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_deleted_comment_post(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts():
+        return
+    bump_version(POST, instance.post_id)
+    update_post_score(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def fill_follow_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # Счетчик меняется первым: от него зависит, рассылается ли автор
+        change_follow_counts(instance.user_id, instance.author_id, 1)
+        backfill_follow(instance.user_id, instance.author_id)
+        reconcile_popular_author(instance.author_id, 1)
+        bump_version(FOLLOWING, instance.user_id)
+        bump_version(FOLLOWERS, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_follow_feed(sender, instance, **kwargs):
+    prune_follow(instance.user_id, instance.author_id)
+    change_follow_counts(instance.user_id, instance.author_id, -1)
+    reconcile_popular_author(instance.author_id, -1)
+    bump_version(FOLLOWING, instance.user_id)
+    bump_version(FOLLOWERS, instance.author_id)
@@ -0,0 +1,217 @@
+import gzip
+import json
+import os
+import re
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    Count, ExpressionWrapper, F, IntegerField, Max, Sum
+)
+from django.urls import reverse
+
+from .models import Post, Group
+
+User = get_user_model()
+
+INDEX_NAME = 'sitemap.xml'
+MANIFEST_NAME = 'manifest.json'
+SHARD_NAME = re.compile(r'(posts|profiles|groups)-\d{4}\.xml\.gz')
+CHUNK_SIZE = 2000
+
+URLSET_START = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+URLSET_END = '</urlset>\n'
+
+
+def _latest_posts(field, start, end):
+    """{id автора или группы: дата его последнего поста} для диапазона id"""
+    return dict(
+        Post.objects.filter(**{
+            f'{field}__gte': start, f'{field}__lt': end
+        }).values_list(field).annotate(latest=Max('pub_date')).order_by()
+    )
+
+
+def post_urls(start, end):
+    rows = Post.objects.filter(pk__gte=start, pk__lt=end).order_by(
+        'pk'
+    ).values_list('pk', 'pub_date')
+    for pk, pub_date in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield reverse('posts:post_detail', args=(pk,)), pub_date
+
+
+def profile_urls(start, end):
+    latest = _latest_posts('author_id', start, end)
+    rows = User.objects.filter(pk__gte=start, pk__lt=end).order_by(
+        'pk'
+    ).values_list('pk', 'username')
+    for pk, username in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield reverse('posts:profile', args=(username,)), latest.get(pk)
+
+
+def group_urls(start, end):
+    latest = _latest_posts('group_id', start, end)
+    rows = Group.objects.filter(pk__gte=start, pk__lt=end).order_by(
+        'pk'
+    ).values_list('pk', 'slug')
+    for pk, slug in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield reverse('posts:group_list', args=(slug,)), latest.get(pk)
+
+
+# Раздел карты сайта: модель, адреса диапазона id и поле поста,
+# по которому посты относятся к шарду (их даты - lastmod адресов)
+SECTIONS = {
+    'posts': (Post, post_urls, 'pk'),
+    'profiles': (User, profile_urls, 'author_id'),
+    'groups': (Group, group_urls, 'group_id'),
+}
+
+
+def _by_shard(queryset, field, shard_size, *aggregates):
+    """{номер шарда: (агрегаты...)} одним запросом с GROUP BY"""
+    shard = ExpressionWrapper(
+        F(field) / shard_size, output_field=IntegerField()
+    )
+    rows = queryset.annotate(shard=shard).values_list('shard').annotate(
+        *aggregates
+    ).order_by()
+    return {number: values for number, *values in rows}
+
+
+def shard_states(model, post_field, shard_size):
+    """
+    Дешевое состояние каждого непустого шарда без чтения строк:
+    число, MAX и SUM id строк диапазона и те же агрегаты с последней
+    датой для их постов. Добавление и удаление строк и постов меняет
+    состояние. Переименование пользователя или группы - нет, после
+    него нужен полный проход (generate_sitemaps(full=True)).
+    """
+    rows = _by_shard(
+        model.objects.all(), 'pk', shard_size,
+        Count('pk'), Max('pk'), Sum('pk')
+    )
+    posts = _by_shard(
+        Post.objects.filter(**{f'{post_field}__isnull': False}),
+        post_field, shard_size,
+        Count('pk'), Sum('pk'), Max('pub_date')
+    )
+    states = {}
+    for number, (count, max_pk, sum_pk) in rows.items():
+        post_count, post_sum, latest = posts.get(number, (0, 0, None))
+        states[number] = {
+            'count': count,
+            'lastmod': latest.date().isoformat() if latest else None,
+            'state': [
+                count, max_pk, int(sum_pk), post_count, int(post_sum or 0),
+                latest.isoformat() if latest else None
+            ],
+        }
+    return states
+
+
+def _entry(base_url, path, lastmod):
+    entry = f'<url><loc>{escape(base_url + path)}</loc>'
+    if lastmod is not None:
+        entry += f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+    return entry + '</url>\n'
+
+
+def _write_atomic(path, write, compress=False):
+    temp_path = path + '.tmp'
+    opener = gzip.open if compress else open
+    with opener(temp_path, 'wt', encoding='utf-8') as output:
+        write(output)
+    os.replace(temp_path, path)
+
+
+def _write_shard(path, urls, base_url):
+    def write(output):
+        output.write(URLSET_START)
+        for url, lastmod in urls:
+            output.write(_entry(base_url, url, lastmod))
+        output.write(URLSET_END)
+    _write_atomic(path, write, compress=True)
+
+
+def _write_index(root, base_url, manifest):
+    def write(output):
+        output.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<sitemapindex '
+            'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        )
+        for name, shard in sorted(manifest.items()):
+            output.write(
+                f'<sitemap><loc>{escape(base_url + sitemap_url(name))}</loc>'
+            )
+            if shard['lastmod']:
+                output.write(f"<lastmod>{shard['lastmod']}</lastmod>")
+            output.write('</sitemap>\n')
+        output.write('</sitemapindex>\n')
+    _write_atomic(os.path.join(root, INDEX_NAME), write)
+
+
+def sitemap_url(name):
+    return reverse('posts:sitemap_shard', args=(name,))
+
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return {}
+
+
+def generate_sitemaps(root=None, base_url=None, shard_size=None,
+                      full=False):
+    """
+    Пишет шарды карты сайта по shard_size id на файл и индекс к ним.
+    Для каждого раздела один запрос с GROUP BY дает состояние всех
+    шардов (shard_states); строки читаются только для шардов, чье
+    состояние отличается от записанного в манифесте, или для всех
+    при full. Возвращает {'written': [...], 'unchanged': [...],
+    'removed': [...]}.
+    """
+    root = root or settings.SITEMAP_ROOT
+    base_url = (base_url or settings.SITEMAP_BASE_URL).rstrip('/')
+    shard_size = shard_size or settings.SITEMAP_SHARD_SIZE
+    os.makedirs(root, exist_ok=True)
+    old_manifest = load_manifest(root)
+    manifest = {}
+    result = {'written': [], 'unchanged': [], 'removed': []}
+
+    for section, (model, urls, post_field) in SECTIONS.items():
+        states = shard_states(model, post_field, shard_size)
+        for number, shard in sorted(states.items()):
+            name = f'{section}-{number:04d}.xml.gz'
+            shard['base_url'] = base_url
+            manifest[name] = shard
+            path = os.path.join(root, name)
+            previous = old_manifest.get(name)
+            if not full and previous \
+                    and previous.get('state') == shard['state'] \
+                    and previous.get('base_url') == base_url \
+                    and os.path.exists(path):
+                result['unchanged'].append(name)
+                continue
+            start = number * shard_size
+            _write_shard(path, urls(start, start + shard_size), base_url)
+            result['written'].append(name)
+
+    for name in set(old_manifest) - set(manifest):
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            os.remove(path)
+        result['removed'].append(name)
+
+    _write_index(root, base_url, manifest)
+    _write_atomic(
+        os.path.join(root, MANIFEST_NAME),
+        lambda output: json.dump(manifest, output, indent=1)
+    )
+    return result
@@ -0,0 +1,107 @@
+from django.db.models import Count, F
+
+from .models import Post, Follow, UserStats
+
+COUNTERS = ('post_count', 'follower_count', 'following_count')
+
+
+def _create_user_stats(user_id):
+    """
+    Считает счетчики пользователя по таблицам и сохраняет их.
+    Если строку уже создал параллельный запрос, она не меняется.
+    """
+    stats = {
+        'post_count': Post.objects.filter(author_id=user_id).count(),
+        'follower_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id, **stats)], ignore_conflicts=True
+    )
+    return stats
+
+
+def get_user_stats(user_id):
+    """
+    Возвращает счетчики пользователя: {'post_count': ...,
+    'follower_count': ..., 'following_count': ...}.
+    Если счетчиков еще нет, считает их один раз и сохраняет.
+    """
+    stats = UserStats.objects.filter(user_id=user_id).values(
+        *COUNTERS
+    ).first()
+    return stats if stats is not None else _create_user_stats(user_id)
+
+
+def get_post_count(author_id):
+    """Возвращает число публикаций автора из счетчика"""
+    count = UserStats.objects.filter(user_id=author_id).values_list(
+        'post_count', flat=True
+    ).first()
+    if count is None:
+        count = _create_user_stats(author_id)['post_count']
+    return count
+
+
+def change_post_count(author_id, delta):
+    """Атомарно изменяет счетчик публикаций автора на delta"""
+    updated = UserStats.objects.filter(user_id=author_id).update(
+        post_count=F('post_count') + delta
+    )
+    if not updated and delta > 0:
+        _create_user_stats(author_id)
+
+
+def change_follow_counts(user_id, author_id, delta):
+    """
+    Атомарно изменяет на delta число подписок пользователя и число
+    подписчиков автора. Вызывается после сохранения или удаления
+    подписки, поэтому новые счетчики сразу считаются с ней.
+    """
+    for pk, field in (
+        (user_id, 'following_count'), (author_id, 'follower_count')
+    ):
+        updated = UserStats.objects.filter(user_id=pk).update(
+            **{field: F(field) + delta}
+        )
+        if not updated:
+            _create_user_stats(pk)
+
+
+def rebuild_post_counts():
+    """Пересчитывает счетчики публикаций всех авторов"""
+    counts = dict(
+        Post.objects.values_list('author').annotate(count=Count('pk'))
+    )
+    UserStats.objects.exclude(user_id__in=counts).update(post_count=0)
+    for author_id, count in counts.items():
+        if not UserStats.objects.filter(user_id=author_id).update(
+            post_count=count
+        ):
+            _create_user_stats(author_id)
+    return len(counts)
+
+
+def rebuild_follow_counts():
+    """Пересчитывает счетчики подписчиков и подписок всех пользователей"""
+    followers = dict(
+        Follow.objects.values_list('author').annotate(
+            count=Count('pk')
+        ).order_by()
+    )
+    following = dict(
+        Follow.objects.values_list('user').annotate(
+            count=Count('pk')
+        ).order_by()
+    )
+    users = set(followers) | set(following)
+    UserStats.objects.exclude(user_id__in=users).update(
+        follower_count=0, following_count=0
+    )
+    for user_id in users:
+        if not UserStats.objects.filter(user_id=user_id).update(
+            follower_count=followers.get(user_id, 0),
+            following_count=following.get(user_id, 0)
+        ):
+            _create_user_stats(user_id)
+    return len(users)
@@ -0,0 +1,50 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла - sha256 его содержимого.
+    Одинаковые загрузки записываются на диск один раз, а sorl
+    строит для них одни и те же миниатюры.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        hexdigest = digest.hexdigest()
+        name = os.path.join(
+            directory, hexdigest[:2], f'{hexdigest}{extension}'
+        )
+        try:
+            # Файл уже есть: только отмечаем, что он снова нужен, чтобы
+            # его не удалил сборщик картинок (posts.thumbnails)
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Файл с тем же именем содержит те же байты
+        return name
+
+    def _save(self, name, content):
+        # Пишем во временный файл и атомарно переименовываем: при
+        # одновременной загрузке двух копий победит любая из них
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
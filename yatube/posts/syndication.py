@@ -0,0 +1,200 @@
+import hashlib
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import quote_etag
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .cache import INDEX, GROUP, PROFILE, get_version, is_shared_cache
+from .models import Post, Group
+
+User = get_user_model()
+
+RSS = 'rss'
+ATOM = 'atom'
+
+
+class StreamingFeed:
+    """
+    Лента, которая отдается частями: начало документа, по части
+    на каждый пост и окончание.
+    """
+    item_element = 'item'
+
+    def stream(self, encoding='utf-8'):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, encoding)
+        for _ in self.write_parts(handler):
+            yield buffer.getvalue().encode(encoding)
+            buffer.seek(0)
+            buffer.truncate()
+
+    def write_parts(self, handler):
+        handler.startDocument()
+        self.start_document(handler)
+        self.add_root_elements(handler)
+        yield
+        for item in self.items:
+            handler.startElement(
+                self.item_element, self.item_attributes(item)
+            )
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield
+        self.end_document(handler)
+        yield
+
+
+class RssFeed(StreamingFeed, Rss201rev2Feed):
+    def start_document(self, handler):
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+
+    def end_document(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+class AtomFeed(StreamingFeed, Atom1Feed):
+    item_element = 'entry'
+
+    def start_document(self, handler):
+        handler.startElement('feed', self.root_attributes())
+
+    def end_document(self, handler):
+        handler.endElement('feed')
+
+
+FEED_CLASSES = {RSS: RssFeed, ATOM: AtomFeed}
+
+
+def _posts(kind, key):
+    if kind == GROUP:
+        return Post.objects.filter(group__slug=key)
+    if kind == PROFILE:
+        return Post.objects.filter(author__username=key)
+    return Post.objects.all()
+
+
+def _scope(kind, key, newest):
+    """Лента в posts.cache, версия которой сбрасывается при правках"""
+    if kind == INDEX:
+        return (INDEX,)
+    if newest is not None:
+        return (kind, newest[2] if kind == GROUP else newest[3])
+    model, lookup = (Group, 'slug') if kind == GROUP else (User, 'username')
+    pk = model.objects.filter(**{lookup: key}).values_list(
+        'pk', flat=True
+    ).first()
+    if pk is None:
+        raise Http404
+    return (kind, pk)
+
+
+def _describe(kind, key):
+    """Заголовок, ссылка и описание ленты"""
+    if kind == GROUP:
+        group = Group.objects.only('title', 'description').get(slug=key)
+        return (
+            group.title, reverse('posts:group_list', args=(key,)),
+            group.description
+        )
+    if kind == PROFILE:
+        author = User.objects.only(
+            'username', 'first_name', 'last_name'
+        ).get(username=key)
+        return (
+            f'Публикации {author.get_full_name() or author.username}',
+            reverse('posts:profile', args=(key,)), ''
+        )
+    return 'Последние статьи', reverse('posts:index'), ''
+
+
+def build_feed(request, feed_format, kind, key):
+    """Лента из SYNDICATION_ITEMS последних постов, без объектов Post"""
+    title, link, description = _describe(kind, key)
+    feed = FEED_CLASSES[feed_format](
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        language=settings.LANGUAGE_CODE,
+        feed_url=request.build_absolute_uri(),
+    )
+    rows = _posts(kind, key).order_by('-pub_date', '-pk').values_list(
+        'pk', 'text', 'pub_date', 'author__username', 'author__first_name',
+        'author__last_name', 'group__title'
+    )[:settings.SYNDICATION_ITEMS]
+    for pk, text, pub_date, username, first_name, last_name, group in rows:
+        url = request.build_absolute_uri(
+            reverse('posts:post_detail', args=(pk,))
+        )
+        feed.add_item(
+            title=Truncator(text).chars(60),
+            link=url,
+            description=text,
+            unique_id=url,
+            pubdate=pub_date,
+            author_name=f'{first_name} {last_name}'.strip() or username,
+            categories=[group] if group else None,
+        )
+    return feed
+
+
+def _cached_stream(chunks, key):
+    """Отдает части ленты и кеширует ее целиком после последней"""
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(content), settings.FEED_CACHE_TIMEOUT)
+
+
+def feed_response(request, feed_format, kind, key=None):
+    """
+    Ответ с лентой kind ('index', 'group' или 'profile'). Состояние
+    ленты - последний пост (один запрос по индексу) и ее версия
+    в кеше. Из него строятся ETag и ключ кеша, поэтому повторный
+    опрос без новых постов не рендерит ленту. Last-Modified не
+    отдается: правка поста меняет ленту, но не дату последнего поста.
+    ETag отдается только при общем кеше (см. page_etag).
+    """
+    feed_class = FEED_CLASSES.get(feed_format)
+    if feed_class is None:
+        raise Http404
+    newest = _posts(kind, key).order_by('-pub_date', '-pk').values_list(
+        'pub_date', 'pk', 'group_id', 'author_id'
+    ).first()
+    scope = _scope(kind, key, newest)
+    state = [
+        settings.ETAG_RELEASE, request.build_absolute_uri(),
+        get_version(*scope), *(newest[:2] if newest else ())
+    ]
+    etag = quote_etag(
+        hashlib.md5('|'.join(map(str, state)).encode()).hexdigest()
+    )
+
+    shared = is_shared_cache()
+    response = get_conditional_response(request, etag=etag) \
+        if shared else None
+    if response is None:
+        cache_key = 'syndication:' + etag.strip('"')
+        content = cache.get(cache_key)
+        content_type = feed_class.content_type
+        if content is not None:
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            feed = build_feed(request, feed_format, kind, key)
+            response = StreamingHttpResponse(
+                _cached_stream(feed.stream(), cache_key),
+                content_type=content_type
+            )
+    if shared:
+        response['ETag'] = etag
+    return response
@@ -0,0 +1,12 @@
+from django import template
+
+from posts.thumbnails import get_thumbnail
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, alias):
+    """Готовая миниатюра изображения поста размера alias из POST_THUMBNAILS"""
+    return get_thumbnail(image, alias)
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.template.base import Template
+from django.template.loader_tags import BlockNode
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.benchmark import (
+    VIEWS, api_pages, feed_pages, seed_data, run_api_benchmark,
+    run_benchmark, run_template_profile
+)
+from posts.models import Post, Group, Comment, Follow
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_data(self):
+        """Тестовые данные создаются в заданном количестве"""
+        dataset = seed_data(
+            users=5, groups=2, posts=20, comments=10, follows=8, seed=1
+        )
+        self.assertEqual(dataset['follows'], 8)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertEqual(Follow.objects.count(), 8)
+
+    def test_run_benchmark(self):
+        """Отчет содержит задержки и число запросов для каждой вью"""
+        seed_data(users=3, groups=1, posts=15, comments=5, follows=4)
+        results = run_benchmark(requests=3, warmup=1)
+        self.assertEqual(list(results), list(VIEWS))
+        for view, row in results.items():
+            with self.subTest(view=view):
+                self.assertEqual(row['requests'], 3)
+                self.assertGreater(row['queries_max'], 0)
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+                self.assertTrue(
+                    set(row['statuses']) <= {200, 302}, row['statuses']
+                )
+
+    def test_run_api_benchmark(self):
+        """Для каждой ленты есть время и размер ответа HTML и API"""
+        seed_data(users=3, groups=1, posts=15, comments=5, follows=4)
+        results = run_api_benchmark(requests=2, warmup=1)
+        for page in ('index', 'group_posts', 'profile', 'follow_index'):
+            self.assertIn(page, results)
+        self.assertIn('index:2', results)
+        for page, row in results.items():
+            with self.subTest(page=page):
+                self.assertGreater(row['html']['bytes'], row['api']['bytes'])
+
+    def test_feed_pages_follow_cursors(self):
+        """Сценарии листают ленты по курсорам, а не по номерам страниц"""
+        seed_data(users=3, groups=1, posts=25, comments=0, follows=0)
+        client = Client()
+        pages = feed_pages(client, reverse('posts:index'))
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(pages[0], {})
+        posts = [
+            list(client.get(reverse('posts:index'), data).context['page_obj'])
+            for data in pages
+        ]
+        self.assertEqual(len({post.pk for page in posts for post in page}), 25)
+        self.assertEqual(len(api_pages(client, reverse('api:posts'))), 3)
+
+    @mock.patch.object(BlockNode, 'render', BlockNode.render)
+    @mock.patch.object(Template, '_render', Template._render)
+    def test_run_template_profile(self):
+        """Для каждой страницы есть время ее шаблонов"""
+        seed_data(users=3, groups=1, posts=15, comments=5, follows=4)
+        results = run_template_profile(requests=2)
+        for page, rows in results.items():
+            with self.subTest(page=page):
+                templates = [row['template'] for row in rows]
+                self.assertIn('base.html', templates)
+                self.assertTrue(all(row['own_ms'] >= 0 for row in rows))
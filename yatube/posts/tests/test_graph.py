@@ -0,0 +1,159 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.graph import LRUCache, following_cache, following_set
+from posts.models import Follow, UserStats
+from posts.stats import get_user_stats
+from posts.tests.utils import SharedCacheMixin
+
+User = get_user_model()
+
+
+class LRUCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        self.assertEqual(lru.get('a'), 1)
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(lru.get('c'), 3)
+        self.assertEqual(len(lru), 2)
+
+
+class SocialGraphTests(SharedCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        following_cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def follow(self, author):
+        self.client.get(
+            reverse('posts:profile_follow', args=(author.username,))
+        )
+
+    def unfollow(self, author):
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(author.username,))
+        )
+
+    def test_following_set_is_cached(self):
+        """Набор подписок читается из базы один раз до изменения"""
+        self.follow(self.authors[0])
+        following_set(self.user.pk)
+        with CaptureQueriesContext(connection) as context:
+            authors = following_set(self.user.pk)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(authors, {self.authors[0].pk})
+        self.follow(self.authors[1])
+        self.assertEqual(
+            following_set(self.user.pk),
+            {self.authors[0].pk, self.authors[1].pk}
+        )
+        self.unfollow(self.authors[0])
+        self.assertEqual(following_set(self.user.pk), {self.authors[1].pk})
+
+    def test_following_set_without_shared_cache(self):
+        """С кешем в памяти процесса набор подписок не запоминается"""
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        self.follow(self.authors[0])
+        with self.settings(CACHES=locmem):
+            following_set(self.user.pk)
+            # Без сигналов, как подписка в другом процессе: версия
+            # в locmem этого процесса не меняется
+            Follow.objects.bulk_create(
+                [Follow(user=self.user, author=self.authors[1])]
+            )
+            with CaptureQueriesContext(connection) as context:
+                authors = following_set(self.user.pk)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(authors, {self.authors[0].pk, self.authors[1].pk})
+        self.assertEqual(len(following_cache), 0)
+
+    def test_counters_follow_views(self):
+        """Подписка и отписка меняют счетчики обоих пользователей"""
+        for author in self.authors:
+            self.follow(author)
+        self.follow(self.authors[0])
+        self.unfollow(self.authors[2])
+        self.assertEqual(get_user_stats(self.user.pk)['following_count'], 2)
+        self.assertEqual(
+            get_user_stats(self.authors[0].pk)['follower_count'], 1
+        )
+        self.assertEqual(
+            get_user_stats(self.authors[2].pk)['follower_count'], 0
+        )
+
+    def test_rebuild_follow_counts(self):
+        """rebuild_post_counts восстанавливает и счетчики подписок"""
+        for author in self.authors:
+            self.follow(author)
+        UserStats.objects.update(follower_count=7, following_count=7)
+        call_command('rebuild_post_counts', stdout=StringIO())
+        self.assertEqual(get_user_stats(self.user.pk)['following_count'], 3)
+        self.assertEqual(get_user_stats(self.user.pk)['follower_count'], 0)
+        self.assertEqual(
+            get_user_stats(self.authors[1].pk)['follower_count'], 1
+        )
+
+    def test_profile_counts_and_following(self):
+        """Профиль показывает счетчики и подписку без запроса Follow"""
+        self.follow(self.authors[0])
+        url = reverse('posts:profile', args=(self.authors[0].username,))
+        response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['follower_count'], 1)
+        self.assertEqual(response.context['following_count'], 0)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertFalse(any(
+            'posts_follow' in query['sql']
+            for query in context.captured_queries
+        ))
+        # Новый подписчик меняет ETag профиля автора
+        etag = response['ETag']
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.authors[0])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['follower_count'], 2)
+
+    def test_follow_lists(self):
+        """Списки подписчиков и подписок, новые сверху, по страницам"""
+        for author in self.authors:
+            self.follow(author)
+        response = self.client.get(
+            reverse('posts:following', args=(self.user.username,))
+        )
+        self.assertEqual(
+            response.context['people'], list(reversed(self.authors))
+        )
+        self.assertFalse(response.context['followers'])
+        response = self.client.get(
+            reverse('posts:followers', args=(self.authors[0].username,))
+        )
+        self.assertEqual(response.context['people'], [self.user])
+        self.assertTrue(response.context['followers'])
+        response = self.client.get(
+            reverse('posts:followers', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
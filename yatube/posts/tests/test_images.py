@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def make_upload(name='photo.jpg', size=(400, 200), image_format='JPEG',
+                exif=None):
+    image = Image.new('RGB', size, color=(200, 30, 30))
+    output = BytesIO()
+    options = {'exif': exif} if exif is not None else {}
+    image.save(output, image_format, **options)
+    return SimpleUploadedFile(
+        name=name, content=output.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_SIZE=100,
+    POST_IMAGE_FORMAT='WEBP'
+)
+class ImagePipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='User')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def save_form(self, upload, instance=None):
+        form = PostForm(
+            {'text': 'Текст поста'}, {'image': upload}, instance=instance
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = ImagePipelineTests.user
+        post.save()
+        return post
+
+    def test_upload_is_downscaled_and_reencoded(self):
+        """Картинка уменьшается, перекодируется и размеры сохраняются"""
+        post = self.save_form(make_upload())
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertEqual(post.image_size, post.image.size)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (100, 50))
+
+    def test_exif_is_stripped(self):
+        """Метаданные не попадают в сохраненный файл"""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        post = self.save_form(make_upload(exif=exif.tobytes()))
+        with Image.open(post.image.path) as image:
+            self.assertFalse(image.getexif())
+            self.assertNotIn('exif', image.info)
+
+    def test_small_image_keeps_size(self):
+        """Маленькая картинка не увеличивается"""
+        post = self.save_form(make_upload(size=(40, 30)))
+        self.assertEqual((post.image_width, post.image_height), (40, 30))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с огромным числом пикселей не принимается"""
+        form = PostForm({'text': 'Текст'}, {'image': make_upload()})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_too_large_file_rejected(self):
+        """Слишком большой файл не принимается"""
+        form = PostForm({'text': 'Текст'}, {'image': make_upload()})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_clearing_image_resets_dimensions(self):
+        """При удалении картинки сбрасываются ее размеры"""
+        post = self.save_form(make_upload())
+        form = PostForm(
+            {'text': 'Текст поста', 'image-clear': 'on'}, instance=post
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save()
+        self.assertFalse(post.image)
+        self.assertIsNone(post.image_width)
+        self.assertIsNone(post.image_size)
+
+    def test_existing_images_reprocessed(self):
+        """Команда перекодирует картинки, загруженные до обработки"""
+        post = Post.objects.create(
+            text='Старый пост',
+            author=ImagePipelineTests.user,
+            image=make_upload(name='old.png', image_format='PNG')
+        )
+        call_command('process_post_images', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Group, Post, UserStats
+from ..stats import get_post_count
 
 User = get_user_model()
 
@@ -29,3 +33,36 @@ class PostModelTest(TestCase):
         }
         for representation, expected_name in models_with_method_str.items():
             self.assertEqual(representation, expected_name)
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.user_2 = User.objects.create_user(username='auth_2')
+
+    def test_post_count_follows_posts(self):
+        """Счетчик публикаций меняется при создании, переносе и удалении"""
+        self.assertEqual(get_post_count(UserStatsTest.user.pk), 0)
+        post = Post.objects.create(author=UserStatsTest.user, text='Пост')
+        Post.objects.create(author=UserStatsTest.user, text='Пост 2')
+        self.assertEqual(get_post_count(UserStatsTest.user.pk), 2)
+
+        self.assertEqual(get_post_count(UserStatsTest.user_2.pk), 0)
+        post.author = UserStatsTest.user_2
+        post.save()
+        self.assertEqual(get_post_count(UserStatsTest.user.pk), 1)
+        self.assertEqual(get_post_count(UserStatsTest.user_2.pk), 1)
+
+        Post.objects.filter(author=UserStatsTest.user).delete()
+        self.assertEqual(get_post_count(UserStatsTest.user.pk), 0)
+
+    def test_rebuild_post_counts(self):
+        """Команда rebuild_post_counts восстанавливает счетчики"""
+        Post.objects.create(author=UserStatsTest.user, text='Пост')
+        UserStats.objects.update_or_create(
+            user=UserStatsTest.user, defaults={'post_count': 42}
+        )
+        call_command('rebuild_post_counts', stdout=StringIO())
+        self.assertEqual(get_post_count(UserStatsTest.user.pk), 1)
@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, Comment, Follow
+from posts.popular import compute_score, refresh_scores, update_post_score
+
+User = get_user_model()
+
+
+class ScoreTests(TestCase):
+    def test_compute_score(self):
+        """Рейтинг растет с обсуждением и подписчиками и затухает"""
+        now = timezone.now()
+        day_ago = now - timedelta(days=1)
+        base = compute_score(day_ago, (), 0)
+        self.assertGreater(compute_score(now, (), 0), base)
+        self.assertGreater(compute_score(day_ago, (), 100), base)
+        self.assertGreater(compute_score(day_ago, [now], 0), base)
+        # Свежие комментарии весят больше старых
+        self.assertGreater(
+            compute_score(day_ago, [now], 0),
+            compute_score(day_ago, [day_ago], 0)
+        )
+
+    def test_score_survives_large_ages(self):
+        """Рейтинг считается без переполнения и через годы после поста"""
+        long_ago = timezone.now() - timedelta(days=3650)
+        score = compute_score(long_ago, [timezone.now()] * 3, 10)
+        self.assertGreater(score, compute_score(timezone.now(), (), 0))
+
+
+class PopularSignalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def score(self, post):
+        return Post.objects.values_list('score', flat=True).get(pk=post.pk)
+
+    def test_new_post_is_scored(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertAlmostEqual(
+            self.score(post), compute_score(post.pub_date, (), 1), places=3
+        )
+
+    def test_comments_update_score(self):
+        """Комментарий добавляет вклад, удаление пересчитывает рейтинг"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        before = self.score(post)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        after = self.score(post)
+        self.assertGreater(after, before)
+        update_post_score(post.pk)
+        self.assertAlmostEqual(self.score(post), after)
+        comment.delete()
+        self.assertAlmostEqual(self.score(post), before)
+
+    def test_post_delete_skips_comment_rescoring(self):
+        """Удаление поста не пересчитывает рейтинг после комментариев"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.reader, text=f'Комментарий {n}')
+            for n in range(5)
+        ])
+        with CaptureQueriesContext(connection) as context:
+            post.delete()
+        self.assertFalse(any(
+            query['sql'].startswith('UPDATE "posts_post"')
+            for query in context.captured_queries
+        ))
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        # После удаления поста комментарии снова пересчитывают рейтинг
+        other = Post.objects.create(text='Другой пост', author=self.author)
+        before = self.score(other)
+        Comment.objects.create(
+            post=other, author=self.reader, text='Комментарий'
+        ).delete()
+        self.assertAlmostEqual(self.score(other), before)
+
+    def test_refresh_scores(self):
+        """Пересчет учитывает изменившееся число подписчиков"""
+        posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(3)
+        ]
+        Follow.objects.create(
+            user=User.objects.create(username='other'), author=self.author
+        )
+        self.assertEqual(refresh_scores(chunk_size=2), 3)
+        for post in posts:
+            self.assertAlmostEqual(
+                self.score(post), compute_score(post.pub_date, (), 2)
+            )
+
+
+class PopularViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author)
+            for number in range(12)
+        ]
+        # Самый старый пост обсуждают прямо сейчас
+        for _ in range(5):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.author, text='Комментарий'
+            )
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_popular_order_and_pages(self):
+        """Посты идут по рейтингу, страницы по курсору не повторяются"""
+        response = self.client.get(reverse('posts:popular'))
+        page = response.context['page_obj']
+        self.assertEqual(page[0], self.posts[0])
+        scores = [post.score for post in page]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        response = self.client.get(
+            reverse('posts:popular'), {'cursor': page.next_cursor}
+        )
+        second = response.context['page_obj']
+        self.assertEqual(
+            {post.pk for post in page} | {post.pk for post in second},
+            {post.pk for post in self.posts}
+        )
+
+    def test_popular_costs_no_more_than_index(self):
+        counts = []
+        for name in ('posts:index', 'posts:popular'):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(reverse(name))
+            counts.append(len(context.captured_queries))
+        self.assertLessEqual(counts[1], counts[0])
@@ -0,0 +1,133 @@
+import re
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+
+from core.utils import encode_cursor, CURSOR_NEXT
+from posts.feeds import is_push_mode
+from posts.models import Post, Group, Comment, Follow
+
+User = get_user_model()
+
+# Таблицы-справочники, которые допустимо читать целиком
+# (например, список групп в форме публикации), и производные таблицы
+# подзапросов COUNT(*).
+FULL_SCAN_ALLOWED = ('posts_group', 'subquery')
+# Лента подписок объединяет посты нескольких авторов, поэтому в режиме
+# чтения при запросе (pull) сортировка слиянием неизбежна.
+TEMP_SORT_ALLOWED = ('/follow/',)
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+
+class QueryPlanTests(TestCase):
+    """
+    Каждый запрос каждой вью из posts/views.py не должен читать
+    таблицу целиком или сортировать через временное B-дерево.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        for num_post in range(15):
+            Post.objects.create(
+                text=f'Текст поста {num_post}',
+                author=cls.author,
+                group=cls.group
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryPlanTests.user)
+        cache.clear()
+
+    def assert_plans_use_indexes(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            getattr(self.authorized_client, method)(url, data or {})
+        with connection.cursor() as cursor:
+            selects = [
+                query['sql'] for query in context.captured_queries
+                if query['sql'].startswith('SELECT')
+            ]
+            for sql in selects:
+                # Параметры в captured_queries уже подставлены в текст
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for detail in (row[-1] for row in cursor.fetchall()):
+                    with self.subTest(url=url, sql=sql, plan=detail):
+                        if url not in TEMP_SORT_ALLOWED or is_push_mode():
+                            self.assertNotIn('USE TEMP B-TREE', detail)
+                        scan = FULL_SCAN.match(detail)
+                        if scan:
+                            self.assertIn(scan.group(1), FULL_SCAN_ALLOWED)
+
+    def test_read_views_use_indexes(self):
+        """Вью чтения используют индексы"""
+        post_id = QueryPlanTests.post.pk
+        cursor = Post.objects.order_by('-pub_date', '-pk')[4]
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            reverse('posts:post_detail', kwargs={'post_id': post_id}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=текст',
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': post_id}),
+            reverse('posts:popular'),
+            reverse('posts:followers', args=('Author',)),
+            reverse('posts:following', args=('User',)),
+            reverse('posts:index_feed', args=('rss',)),
+            reverse('posts:group_feed', args=('test-slug', 'rss')),
+            reverse('posts:profile_feed', args=('Author', 'atom')),
+        )
+        for url in urls:
+            self.assert_plans_use_indexes('get', url)
+        self.assert_plans_use_indexes(
+            'get', reverse('posts:index'),
+            {'cursor': encode_cursor(CURSOR_NEXT, cursor)}
+        )
+
+    def test_write_views_use_indexes(self):
+        """Вью записи используют индексы"""
+        post_id = QueryPlanTests.post.pk
+        self.assert_plans_use_indexes(
+            'post',
+            reverse('posts:add_comment', kwargs={'post_id': post_id}),
+            {'text': 'Новый комментарий'}
+        )
+        self.assert_plans_use_indexes(
+            'get',
+            reverse('posts:profile_unfollow', kwargs={'username': 'Author'})
+        )
+        self.assert_plans_use_indexes(
+            'get',
+            reverse('posts:profile_follow', kwargs={'username': 'Author'})
+        )
+
+    @override_settings(FOLLOW_FEED_MODE='push')
+    def test_push_follow_feed_uses_indexes(self):
+        """Лента подписок в режиме push читается по индексу без сортировки"""
+        call_command('rebuild_follow_feeds', stdout=StringIO())
+        cursor = Post.objects.order_by('-pub_date', '-pk')[4]
+        url = reverse('posts:follow_index')
+        self.assert_plans_use_indexes('get', url)
+        self.assert_plans_use_indexes(
+            'get', url, {'cursor': encode_cursor(CURSOR_NEXT, cursor)}
+        )
@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.admin import PostAdmin
+from posts.models import Post, Group
+from posts.search import SearchResults, get_index, _python_index
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User')
+        cls.group = Group.objects.create(
+            title='Путешествия',
+            slug='travel',
+            description='Описание группы'
+        )
+        cls.mountains = Post.objects.create(
+            text='Поход в горы, горы были высокими',
+            author=cls.user,
+            group=cls.group
+        )
+        cls.sea = Post.objects.create(
+            text='Отпуск на море',
+            author=cls.user
+        )
+        for num_post in range(12):
+            Post.objects.create(
+                text=f'Заметка номер {num_post}',
+                author=cls.user
+            )
+
+    def setUp(self):
+        self.client = Client()
+        _python_index.rebuild()
+
+    def search(self, query):
+        return [post.pk for post in SearchResults(query)[:100]]
+
+    def assert_search_works(self):
+        mountains = SearchTests.mountains.pk
+        sea = SearchTests.sea.pk
+        self.assertEqual(self.search('горы'), [mountains])
+        self.assertEqual(self.search('ГОР'), [mountains])
+        self.assertEqual(self.search('отпуск море'), [sea])
+        self.assertEqual(self.search('путешеств'), [mountains])
+        self.assertEqual(self.search('горы море'), [])
+        self.assertEqual(self.search('"*) OR NOT ('), [])
+        self.assertEqual(SearchResults('заметка').count(), 12)
+
+    def test_search_finds_posts(self):
+        """Поиск находит посты по словам текста и названию группы"""
+        self.assert_search_works()
+
+    def test_search_without_fts(self):
+        """Без FTS5 работает индекс в памяти"""
+        with mock.patch('posts.search.use_fts', return_value=False):
+            self.assertIs(get_index(), _python_index)
+            self.assert_search_works()
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении постов и групп"""
+        for use_fts in (True, False):
+            with self.subTest(use_fts=use_fts), mock.patch(
+                'posts.search.use_fts', return_value=use_fts
+            ):
+                post = Post.objects.create(
+                    text='Новый пост про лыжи', author=SearchTests.user
+                )
+                self.assertEqual(self.search('лыжи'), [post.pk])
+                post.text = 'Новый пост про коньки'
+                post.save()
+                self.assertEqual(self.search('лыжи'), [])
+                self.assertEqual(self.search('коньки'), [post.pk])
+                post.delete()
+                self.assertEqual(self.search('коньки'), [])
+
+                group = SearchTests.group
+                group.title = 'Альпинизм'
+                group.save()
+                self.assertEqual(
+                    self.search('альпинизм'), [SearchTests.mountains.pk]
+                )
+                group.title = 'Путешествия'
+                group.save()
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты постранично"""
+        url = reverse('posts:search')
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertIsNone(response.context['page_obj'])
+
+        response = self.client.get(url, {'q': 'заметка'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        response = self.client.get(url, {'q': 'заметка', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+        response = self.client.get(url, {'q': 'горы'})
+        self.assertEqual(
+            list(response.context['page_obj']), [SearchTests.mountains]
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через индекс"""
+        admin = PostAdmin(Post, None)
+        queryset, use_distinct = admin.get_search_results(
+            None, Post.objects.all(), 'горы'
+        )
+        self.assertFalse(use_distinct)
+        self.assertEqual(list(queryset), [SearchTests.mountains])
@@ -0,0 +1,163 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, Group
+from posts.sitemaps import generate_sitemaps
+
+User = get_user_model()
+
+BASE_URL = 'https://yatube.test'
+
+
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def generate(self):
+        return generate_sitemaps(self.root, BASE_URL, shard_size=4)
+
+    def read(self, name):
+        with gzip.open(os.path.join(self.root, name), 'rt') as shard:
+            return shard.read()
+
+    def shard_name(self, section, pk):
+        return f'{section}-{pk // 4:04d}.xml.gz'
+
+    def test_shards_and_index(self):
+        """Адреса разложены по шардам, индекс ссылается на каждый"""
+        result = self.generate()
+        self.assertEqual(result['unchanged'], [])
+        names = {
+            self.shard_name('posts', post.pk) for post in self.posts
+        } | {
+            self.shard_name('profiles', self.author.pk),
+            self.shard_name('groups', self.group.pk),
+        }
+        self.assertEqual(set(result['written']), names)
+        with open(os.path.join(self.root, 'sitemap.xml')) as index:
+            content = index.read()
+        for name in names:
+            self.assertIn(f'{BASE_URL}/sitemaps/{name}', content)
+
+        post = self.posts[0]
+        shard = self.read(self.shard_name('posts', post.pk))
+        self.assertIn(
+            f'<loc>{BASE_URL}/posts/{post.pk}/</loc>'
+            f'<lastmod>{post.pub_date.date().isoformat()}</lastmod>',
+            shard
+        )
+        self.assertIn(
+            f'<loc>{BASE_URL}/profile/author/</loc>',
+            self.read(self.shard_name('profiles', self.author.pk))
+        )
+        self.assertIn(
+            f'<loc>{BASE_URL}/group/group/</loc>',
+            self.read(self.shard_name('groups', self.group.pk))
+        )
+
+    def test_only_changed_shards_are_written(self):
+        """Повторный запуск пишет только шарды с изменившимися строками"""
+        self.generate()
+        self.assertEqual(self.generate()['written'], [])
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        result = self.generate()
+        # Новый пост меняет и дату последней публикации автора
+        self.assertEqual(set(result['written']), {
+            self.shard_name('posts', post.pk),
+            self.shard_name('profiles', self.author.pk),
+        })
+        self.assertIn(
+            f'/posts/{post.pk}/',
+            self.read(self.shard_name('posts', post.pk))
+        )
+
+    def test_unchanged_run_reads_only_aggregates(self):
+        """Без изменений строки не читаются: по запросу на агрегаты"""
+        self.generate()
+        with CaptureQueriesContext(connection) as context:
+            result = self.generate()
+        self.assertEqual(result['written'], [])
+        # Строки раздела и их посты для каждого из трех разделов
+        self.assertEqual(len(context.captured_queries), 6)
+        self.assertTrue(all(
+            'GROUP BY' in query['sql'] for query in context.captured_queries
+        ))
+
+    def test_deleted_post_marks_shard_dirty(self):
+        """Удаление не последнего поста диапазона меняет его шард"""
+        self.generate()
+        pk = self.posts[1].pk
+        Post.objects.filter(pk=pk).delete()
+        result = self.generate()
+        self.assertIn(self.shard_name('posts', pk), result['written'])
+        self.assertNotIn(
+            f'/posts/{pk}/', self.read(self.shard_name('posts', pk))
+        )
+
+    def test_full_run_rewrites_renamed_shards(self):
+        """Переименование находит только полный проход"""
+        self.generate()
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed')
+        name = self.shard_name('groups', self.group.pk)
+        self.assertEqual(self.generate()['written'], [])
+        result = generate_sitemaps(
+            self.root, BASE_URL, shard_size=4, full=True
+        )
+        self.assertIn(name, result['written'])
+        self.assertIn('/group/renamed/', self.read(name))
+
+    def test_empty_shards_are_removed(self):
+        self.generate()
+        last = self.posts[-1]
+        name = self.shard_name('posts', last.pk)
+        Post.objects.filter(
+            pk__gte=last.pk // 4 * 4, pk__lt=last.pk // 4 * 4 + 4
+        ).delete()
+        result = self.generate()
+        self.assertEqual(result['removed'], [name])
+        self.assertFalse(os.path.exists(os.path.join(self.root, name)))
+
+    def test_command_and_view(self):
+        """Команда создает файлы, вью отдает индекс и шарды"""
+        with override_settings(SITEMAP_ROOT=self.root):
+            call_command(
+                'generate_sitemaps', '--shard-size', '4', stdout=StringIO()
+            )
+            response = self.client.get(reverse('posts:sitemap'))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'<sitemapindex', b''.join(response))
+            name = self.shard_name('posts', self.posts[0].pk)
+            response = self.client.get(
+                reverse('posts:sitemap_shard', args=(name,))
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/gzip')
+            response.close()
+            for name in ('manifest.json', 'posts-9999.xml.gz'):
+                response = self.client.get(
+                    reverse('posts:sitemap_shard', args=(name,))
+                )
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, get_thumbnail
+from posts.tests.test_images import make_upload
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+# Файлы удаляются после коммита, поэтому нужны настоящие транзакции.
+# Без grace только что загруженный файл удаляется сразу.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_GC_GRACE=0)
+class ContentAddressedStorageTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='User')
+        self.storage = Post._meta.get_field('image').storage
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, upload):
+        return Post.objects.create(
+            text='Текст поста', author=self.user, image=upload
+        )
+
+    def reupload(self, name):
+        """Загружает заново те же байты, что и в файле name"""
+        upload = 'posts/upload' + os.path.splitext(name)[1]
+        with self.storage.open(name) as source:
+            return self.storage.save(upload, ContentFile(source.read()))
+
+    def age(self, name):
+        """Делает файл старше POST_IMAGE_GC_GRACE"""
+        moment = time.time() - 2 * 60 * 60
+        os.utime(self.storage.path(name), (moment, moment))
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки хранятся в одном файле"""
+        first = self.create_post(make_upload(name='first.jpg'))
+        second = self.create_post(make_upload(name='second.jpg'))
+        other = self.create_post(make_upload(size=(300, 300)))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1
+        )
+
+    def test_name_is_content_hash(self):
+        """Имя файла не зависит от имени загрузки"""
+        name = self.storage.save('posts/a.txt', ContentFile(b'data'))
+        self.assertEqual(
+            name, 'posts/3a/3a6eb0790f39ac87c94f3856b2dd2c5d'
+            '110e6811602261a9a923d3bb23adc8b7.txt'
+        )
+        self.assertEqual(
+            self.storage.save('posts/b.txt', ContentFile(b'data')), name
+        )
+
+    def test_thumbnails_shared_between_duplicates(self):
+        """Миниатюры дубликата берутся готовыми"""
+        first = self.create_post(make_upload(name='first.jpg'))
+        generate_thumbnails(first.image.name, first.pk)
+        second = self.create_post(make_upload(name='second.jpg'))
+        self.assertEqual(
+            get_thumbnail(first.image, 'card').name,
+            get_thumbnail(second.image, 'card').name
+        )
+        self.assertNotEqual(
+            get_thumbnail(second.image, 'card').name, second.image.name
+        )
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл и миниатюры удаляются вместе с последним постом"""
+        first = self.create_post(make_upload(name='first.jpg'))
+        second = self.create_post(make_upload(name='second.jpg'))
+        generate_thumbnails(first.image.name, first.pk)
+        path = first.image.path
+        thumbnail = get_thumbnail(first.image, 'card')
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(thumbnail.exists())
+
+    def test_replaced_image_released(self):
+        """Замененная картинка удаляется, если на нее нет ссылок"""
+        post = self.create_post(make_upload())
+        path = post.image.path
+        post.image = make_upload(name='new.jpg', size=(300, 300))
+        post.save()
+        self.assertFalse(os.path.exists(path))
+
+    def test_reprocessed_original_released(self):
+        """После перекодирования старый оригинал удаляется"""
+        post = self.create_post(
+            make_upload(name='old.png', image_format='PNG')
+        )
+        path = post.image.path
+        call_command('process_post_images', stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(POST_IMAGE_GC_GRACE=60 * 60)
+    def test_reupload_before_release_keeps_file(self):
+        """
+        Загрузка тех же байт, чей пост еще не сохранен, не дает
+        удалить файл последнему посту
+        """
+        post = self.create_post(make_upload())
+        name = post.image.name
+        self.age(name)
+        with transaction.atomic():
+            Post.objects.filter(pk=post.pk).delete()
+            self.assertEqual(self.reupload(name), name)
+        self.create_post(name)
+        self.assertTrue(self.storage.exists(name))
+
+    @override_settings(POST_IMAGE_GC_GRACE=60 * 60)
+    def test_reupload_during_release_keeps_file(self):
+        """Загрузка между проверкой ссылок и удалением не теряет файл"""
+        post = self.create_post(make_upload())
+        name = post.image.name
+        self.age(name)
+        rename = os.rename
+
+        def reupload_and_rename(*args):
+            self.reupload(name)
+            rename(*args)
+
+        with mock.patch(
+            'posts.thumbnails.os.rename', side_effect=reupload_and_rename
+        ):
+            post.delete()
+        self.create_post(name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(
+            os.listdir(os.path.dirname(self.storage.path(name))),
+            [os.path.basename(name)]
+        )
+
+    @override_settings(POST_IMAGE_GC_GRACE=60 * 60)
+    def test_sweep_removes_old_orphans(self):
+        """Сборщик удаляет только старые файлы без ссылок"""
+        kept = self.create_post(make_upload()).image.name
+        fresh = self.create_post(make_upload(size=(300, 300)))
+        orphan = self.create_post(make_upload(size=(400, 400)))
+        Post.objects.filter(pk__in=(fresh.pk, orphan.pk)).delete()
+        self.age(kept)
+        self.age(orphan.image.name)
+        self.assertTrue(self.storage.exists(orphan.image.name))
+
+        call_command('sweep_post_images', stdout=StringIO())
+        self.assertTrue(self.storage.exists(kept))
+        self.assertTrue(self.storage.exists(fresh.image.name))
+        self.assertFalse(self.storage.exists(orphan.image.name))
@@ -0,0 +1,134 @@
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, Group
+from posts.tests.utils import SharedCacheMixin
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+@override_settings(SYNDICATION_ITEMS=3)
+class SyndicationTests(SharedCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.other = User.objects.create(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы'
+        )
+        for number in range(4):
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+        Post.objects.create(text='Чужой пост', author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_feed(self, url, **headers):
+        response = self.client.get(url, **headers)
+        content = b''.join(response.streaming_content) \
+            if response.streaming else response.content
+        return response, content
+
+    def test_rss(self):
+        """RSS с последними постами сайта, не больше SYNDICATION_ITEMS"""
+        response, content = self.get_feed(
+            reverse('posts:index_feed', args=('rss',))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/rss+xml'
+        ))
+        channel = ElementTree.fromstring(content).find('channel')
+        self.assertEqual(
+            [item.findtext('title') for item in channel.iter('item')],
+            ['Чужой пост', 'Пост 3', 'Пост 2']
+        )
+
+    def test_atom_group_and_profile(self):
+        """Atom группы и автора содержат только их посты"""
+        for url, title in (
+            (reverse('posts:group_feed', args=('group', 'atom')), 'Группа'),
+            (
+                reverse('posts:profile_feed', args=('author', 'atom')),
+                'Публикации Имя Фамилия'
+            ),
+        ):
+            with self.subTest(url=url):
+                response, content = self.get_feed(url)
+                feed = ElementTree.fromstring(content)
+                self.assertEqual(feed.findtext(f'{ATOM}title'), title)
+                entries = feed.findall(f'{ATOM}entry')
+                self.assertEqual(
+                    [entry.findtext(f'{ATOM}title') for entry in entries],
+                    ['Пост 3', 'Пост 2', 'Пост 1']
+                )
+                self.assertEqual(
+                    entries[0].findtext(f'{ATOM}author/{ATOM}name'),
+                    'Имя Фамилия'
+                )
+
+    def test_not_found(self):
+        """Неизвестные формат, группа и автор - 404"""
+        for url in (
+            reverse('posts:index_feed', args=('json',)),
+            reverse('posts:group_feed', args=('missing', 'rss')),
+            reverse('posts:profile_feed', args=('missing', 'rss')),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_empty_feed(self):
+        """У автора без постов пустая лента"""
+        Post.objects.filter(author=self.other).delete()
+        response, content = self.get_feed(
+            reverse('posts:profile_feed', args=('other', 'rss'))
+        )
+        self.assertEqual(response.status_code, 200)
+        channel = ElementTree.fromstring(content).find('channel')
+        self.assertEqual(list(channel.iter('item')), [])
+
+    def test_repeated_poll(self):
+        """
+        Повторный опрос: 304 по ETag или лента из кеша,
+        в обоих случаях один запрос к базе
+        """
+        url = reverse('posts:group_feed', args=('group', 'rss'))
+        response, content = self.get_feed(url)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 1)
+        with CaptureQueriesContext(connection) as context:
+            cached, cached_content = self.get_feed(url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached_content, content)
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_new_and_edited_posts_change_feed(self):
+        """Новый пост и правка поста дают новый ETag"""
+        url = reverse('posts:index_feed', args=('atom',))
+        etags = [self.get_feed(url)[0]['ETag']]
+        post = Post.objects.create(text='Новый пост', author=self.other)
+        response, content = self.get_feed(url)
+        etags.append(response['ETag'])
+        self.assertIn('Новый пост'.encode(), content)
+        post.text = 'Исправленный пост'
+        post.save()
+        response, content = self.get_feed(url)
+        etags.append(response['ETag'])
+        self.assertIn('Исправленный пост'.encode(), content)
+        self.assertEqual(len(set(etags)), 3)
@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, get_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста',
+            author=User.objects.create(username='User'),
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_thumbnails_are_precomputed(self):
+        """Шаблоны получают готовые миниатюры всех размеров"""
+        image = ThumbnailTests.post.image
+        # Пока миниатюр нет, показывается исходное изображение
+        self.assertEqual(get_thumbnail(image, 'card'), image)
+
+        generate_thumbnails(image.name, ThumbnailTests.post.pk)
+        names = set()
+        for alias in settings.POST_THUMBNAILS:
+            with self.subTest(alias=alias):
+                thumbnail = get_thumbnail(image, alias)
+                self.assertNotEqual(thumbnail.name, image.name)
+                self.assertTrue(thumbnail.exists())
+                names.add(thumbnail.name)
+        self.assertEqual(len(names), len(settings.POST_THUMBNAILS))
+
+    def test_post_without_image(self):
+        """Для поста без картинки миниатюры нет"""
+        post = Post.objects.create(
+            text='Без картинки', author=ThumbnailTests.post.author
+        )
+        self.assertIsNone(get_thumbnail(post.image, 'index'))
@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Post, Group, Comment, Follow, UserStats
+from posts.search import search_post_ids
+from posts.transfer import (
+    CSV, JSONL, export_records, import_records, read_records, write_records
+)
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Текст с "кавычками",\nзапятой и переводом строки',
+            author=cls.author, group=cls.group
+        )
+        Post.objects.create(text='Пост без группы', author=cls.reader)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'author', 'group', 'text', 'pub_date'
+            )),
+            list(Comment.objects.values_list(
+                'pk', 'post', 'author', 'text', 'created'
+            )),
+            list(Follow.objects.values_list('user', 'author')),
+        )
+
+    def round_trip(self, file_format):
+        before = self.snapshot()
+        output = StringIO()
+        write_records(export_records(chunk_size=1), output, file_format)
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        self.assertFalse(Comment.objects.exists())
+
+        output.seek(0)
+        stats = import_records(
+            read_records(output, file_format), batch_size=1
+        )
+        self.assertEqual(stats, {
+            'post': [2, 0], 'comment': [1, 0], 'follow': [1, 0]
+        })
+        self.assertEqual(self.snapshot(), before)
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка JSON Lines загружается без потерь"""
+        self.round_trip(JSONL)
+
+    def test_csv_round_trip(self):
+        """Выгрузка CSV загружается без потерь"""
+        self.round_trip(CSV)
+
+    def test_import_is_idempotent(self):
+        """Повторный импорт не создает дубликатов"""
+        records = list(export_records())
+        stats = import_records(records)
+        self.assertEqual(stats, {
+            'post': [0, 2], 'comment': [0, 1], 'follow': [0, 1]
+        })
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_unknown_references_skipped(self):
+        """Записи с неизвестными авторами и группами пропускаются"""
+        stats = import_records([
+            {'type': 'post', 'id': 100, 'author': 'Nobody', 'text': 'x',
+             'date': '2023-01-01T00:00:00+00:00'},
+            {'type': 'post', 'id': 101, 'author': 'Author',
+             'group': 'missing', 'text': 'x',
+             'date': '2023-01-01T00:00:00+00:00'},
+            {'type': 'follow', 'user': 'Author', 'author': 'Author'},
+        ])
+        self.assertEqual(stats['post'], [0, 2])
+        self.assertEqual(stats['follow'], [0, 1])
+        self.assertFalse(Post.objects.filter(pk__in=(100, 101)).exists())
+
+    def test_conflicting_ids_get_new_ids(self):
+        """
+        Пост и комментарий, чьи id заняты другими строками, получают
+        новые id, а комментарии попадают к своему посту
+        """
+        post_id = TransferTests.post.pk
+        comment_id = Comment.objects.get().pk
+        records = [
+            {'type': 'post', 'id': post_id, 'author': 'Reader',
+             'text': 'Другой пост', 'date': '2023-01-01T00:00:00+00:00'},
+            {'type': 'comment', 'id': comment_id, 'post': post_id,
+             'author': 'Author', 'text': 'Перенесенный комментарий',
+             'date': '2023-01-02T00:00:00+00:00'},
+        ]
+        stats = import_records(records)
+        self.assertEqual(stats['post'], [1, 0])
+        self.assertEqual(stats['comment'], [1, 0])
+        self.assertEqual(Post.objects.get(pk=post_id).author, self.author)
+        moved = Post.objects.get(text='Другой пост')
+        self.assertNotEqual(moved.pk, post_id)
+        self.assertEqual(moved.pub_date.year, 2023)
+        comment = Comment.objects.get(text='Перенесенный комментарий')
+        self.assertEqual(comment.post, moved)
+        self.assertEqual(comment.created.day, 2)
+
+        stats = import_records(records)
+        self.assertEqual(stats['post'], [0, 1])
+        self.assertEqual(stats['comment'], [0, 1])
+        self.assertEqual(Post.objects.filter(text='Другой пост').count(), 1)
+
+    def test_comment_of_skipped_post_skipped(self):
+        """Комментарий к незагруженному посту пропускается"""
+        stats = import_records([
+            {'type': 'post', 'id': 100, 'author': 'Nobody', 'text': 'x',
+             'date': '2023-01-01T00:00:00+00:00'},
+            {'type': 'comment', 'id': 100, 'post': 100, 'author': 'Author',
+             'text': 'x', 'date': '2023-01-02T00:00:00+00:00'},
+            {'type': 'comment', 'id': 101, 'post': 200, 'author': 'Author',
+             'text': 'x', 'date': '2023-01-02T00:00:00+00:00'},
+        ])
+        self.assertEqual(stats['comment'], [0, 2])
+        self.assertFalse(Comment.objects.filter(pk__in=(100, 101)).exists())
+
+    def test_commands(self):
+        """Команды переносят данные и пересчитывают производные"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.csv')
+            call_command('export_posts', path, stderr=StringIO())
+            Post.objects.all().delete()
+            Follow.objects.all().delete()
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user=TransferTests.author).post_count, 1
+        )
+        self.assertEqual(
+            search_post_ids('кавычками'), [TransferTests.post.pk]
+        )
+
+    def test_export_to_stdout(self):
+        """Выгрузка в stdout: по записи JSON в строке"""
+        output = StringIO()
+        call_command('export_posts', '-', stdout=output, stderr=StringIO())
+        lines = output.getvalue().splitlines()
+        self.assertEqual(
+            [json.loads(line)['type'] for line in lines],
+            ['post', 'post', 'comment', 'follow']
+        )
@@ -1,20 +1,31 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
-from django.test import TestCase, Client, override_settings
+from django.test import (
+    TestCase, TransactionTestCase, Client, override_settings
+)
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Post, Group, Comment, Follow
+from posts.models import Post, Group, Comment, Follow, FeedEntry
+from posts.tests.utils import SharedCacheMixin
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 User = get_user_model()
 
+# Автор поста для ETag, пост с автором и группой, счетчик постов,
+# страница комментариев вместе с авторами
+COMMENTS_QUERY_BUDGET = 4
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class StaticViewTests(TestCase):
@@ -119,10 +130,9 @@ class StaticViewTests(TestCase):
         self.assertEqual(task_text, StaticViewTests.post.text)
         self.assertEqual(task_author, StaticViewTests.user.username)
         self.assertEqual(task_group, StaticViewTests.group.title)
-        self.assertEqual(
-            str(task_image).split('/')[1],
-            str(StaticViewTests.uploaded)
-        )
+        # Хранилище называет файлы по хешу содержимого
+        self.assertEqual(task_image, StaticViewTests.post.image)
+        self.assertTrue(str(task_image).startswith('posts/'))
 
     def test_index_page_correct_context(self):
         """Шаблон index сформирован с правильным контекстом"""
@@ -222,7 +232,10 @@ class StaticViewTests(TestCase):
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertContains(response, StaticViewTests.post.text)
 
-        Post.objects.all().delete()
+        # update() не отправляет сигналы, поэтому кеш не сбрасывается
+        Post.objects.filter(pk=StaticViewTests.post.pk).update(
+            text='Измененный текст'
+        )
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertContains(response, StaticViewTests.post.text)
 
@@ -230,6 +243,63 @@ class StaticViewTests(TestCase):
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotContains(response, StaticViewTests.post.text)
 
+    def test_cache_invalidated_on_changes(self):
+        """Кеш лент и поста сбрасывается при изменении постов и комментариев"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'User'}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        post = Post.objects.create(
+            text='Свежий пост',
+            author=StaticViewTests.user,
+            group=StaticViewTests.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, post.text)
+
+        detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': StaticViewTests.post.pk}
+        )
+        self.authorized_client.get(detail_url)
+        Comment.objects.create(
+            post=StaticViewTests.post,
+            author=StaticViewTests.user_2,
+            text='Свежий комментарий'
+        )
+        response = self.authorized_client.get(detail_url)
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_fragments_vary_by_object(self):
+        """Фрагменты разных групп, авторов и постов с одной версией"""
+        author = User.objects.create(username='Other')
+        group = Group.objects.create(
+            title='Другая группа', slug='other-slug', description='Описание'
+        )
+        post = Post.objects.create(
+            text='Другой пост', author=author, group=group
+        )
+        pages = (
+            ('posts:group_list', 'test-slug', 'other-slug'),
+            ('posts:profile', 'User', 'Other'),
+            ('posts:post_detail', StaticViewTests.post.pk, post.pk),
+        )
+        with mock.patch('posts.cache.get_version', return_value=1):
+            for name, first, second in pages:
+                with self.subTest(name=name):
+                    self.authorized_client.get(reverse(name, args=(first,)))
+                    response = self.authorized_client.get(
+                        reverse(name, args=(second,))
+                    )
+                    self.assertContains(response, post.text)
+                    self.assertNotContains(
+                        response, StaticViewTests.post.text
+                    )
+
     def test_follow_unfollow(self):
         """
         Авторизованный пользователь может \
@@ -311,6 +381,14 @@ class PaginatorViewTests(TestCase):
         # Создаем авторизованый клиент
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewTests.user)
+        cache.clear()
+
+    def get_second_page(self, url):
+        """Вторая страница по курсору со ссылки "Следующая" первой"""
+        response = self.authorized_client.get(url)
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'?cursor={next_cursor}')
+        return self.authorized_client.get(url, {'cursor': next_cursor})
 
     def test_index_first_page(self):
         """Шаблон index выводит нужное кол-во постов на первую страницу"""
@@ -321,11 +399,16 @@ class PaginatorViewTests(TestCase):
 
     def test_index_second_page(self):
         """Шаблон index выводит нужное кол-во постов на вторую страницу"""
-        response = self.authorized_client.get(
-            reverse('posts:index') + '?page=2'
-        )
+        response = self.get_second_page(reverse('posts:index'))
         self.assertEqual(len(response.context['page_obj']), 5)
 
+    def test_index_pages_cached_separately(self):
+        """Каждая страница index кешируется отдельно"""
+        first = self.authorized_client.get(reverse('posts:index'))
+        second = self.get_second_page(reverse('posts:index'))
+        self.assertContains(first, 'Текст поста 15')
+        self.assertNotContains(second, 'Текст поста 15')
+
     def test_group_post_first_page(self):
         """Шаблон group_post выводит нужное кол-во постов на первую страницу"""
         response = self.authorized_client.get(
@@ -335,11 +418,8 @@ class PaginatorViewTests(TestCase):
 
     def test_group_post_second_page(self):
         """Шаблон group_post выводит нужное кол-во постов на вторую страницу"""
-        response = self.authorized_client.get(
-            reverse(
-                'posts:group_list', kwargs={'slug': 'test-slug'}
-            )
-            + '?page=2'
+        response = self.get_second_page(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'})
         )
         self.assertEqual(len(response.context['page_obj']), 5)
 
@@ -352,10 +432,370 @@ class PaginatorViewTests(TestCase):
 
     def test_profile_second_page(self):
         """Шаблон profile выводит нужное кол-во постов на вторую страницу"""
+        response = self.get_second_page(
+            reverse('posts:profile', kwargs={'username': 'User'})
+        )
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_first_page_without_count_and_offset(self):
+        """
+        Первая страница - один запрос с LIMIT, без COUNT и OFFSET даже
+        с холодным кешем; общее число берется только из счетчика
+        """
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'User'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    response = self.authorized_client.get(url)
+                sql = ' '.join(
+                    query['sql'] for query in context.captured_queries
+                )
+                self.assertNotIn('COUNT(', sql)
+                self.assertNotIn('OFFSET', sql)
+                self.assertNotContains(response, '?page=')
+                self.assertNotContains(response, 'Последняя')
+        self.assertContains(response, 'Всего записей: 15')
+        response = self.authorized_client.get(urls[0])
+        self.assertNotContains(response, 'Всего записей')
+
+    def test_index_cursor_pages(self):
+        """Курсорная пагинация index листает вперед и назад без пропусков"""
+        response = self.authorized_client.get(reverse('posts:index'))
+        first_page = list(response.context['page_obj'])
+        next_cursor = response.context['page_obj'].next_cursor
+
         response = self.authorized_client.get(
-            reverse(
-                'posts:profile', kwargs={'username': 'User'}
+            reverse('posts:index') + f'?cursor={next_cursor}'
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 5)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+        self.assertEqual(
+            len(set(first_page) | set(page_obj)), Post.objects.count()
+        )
+
+        response = self.authorized_client.get(
+            reverse('posts:index') + f'?cursor={page_obj.previous_cursor}'
+        )
+        self.assertEqual(list(response.context['page_obj']), first_page)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор возвращает первую страницу"""
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'User'})
+            + '?cursor=broken'
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+@override_settings(FOLLOW_FEED_MODE='push', FOLLOW_FEED_PUSH_THRESHOLD=1)
+class FollowFeedPushTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='User')
+        cls.author = User.objects.create(username='Author')
+        cls.popular = User.objects.create(username='Popular')
+        cls.fan = User.objects.create(username='Fan')
+        Follow.objects.create(user=cls.fan, author=cls.popular)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FollowFeedPushTests.user)
+
+    def follow_feed_posts(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка заполняет ленту, отписка очищает ее"""
+        post = Post.objects.create(
+            text='Старый пост', author=FollowFeedPushTests.author
+        )
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'Author'}
+        ))
+        self.assertEqual(self.follow_feed_posts(), [post])
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'Author'}
+        ))
+        self.assertEqual(self.follow_feed_posts(), [])
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленту подписчика"""
+        Follow.objects.create(
+            user=FollowFeedPushTests.user, author=FollowFeedPushTests.author
+        )
+        post = Post.objects.create(
+            text='Новый пост', author=FollowFeedPushTests.author
+        )
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FollowFeedPushTests.user, post=post
+        ).exists())
+        self.assertEqual(self.follow_feed_posts(), [post])
+
+    def test_popular_author_is_pulled(self):
+        """Посты популярного автора не рассылаются, но видны в ленте"""
+        Follow.objects.create(
+            user=FollowFeedPushTests.user, author=FollowFeedPushTests.popular
+        )
+        cache.clear()
+        post = Post.objects.create(
+            text='Популярный пост', author=FollowFeedPushTests.popular
+        )
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.follow_feed_posts(), [post])
+
+    def test_author_becoming_popular_is_pulled(self):
+        """Ставший популярным автор убирается из лент и читается при запросе"""
+        Follow.objects.create(
+            user=FollowFeedPushTests.user, author=FollowFeedPushTests.author
+        )
+        post = Post.objects.create(
+            text='Пост до порога', author=FollowFeedPushTests.author
+        )
+        self.assertTrue(FeedEntry.objects.filter(post=post).exists())
+        Follow.objects.create(
+            user=FollowFeedPushTests.fan, author=FollowFeedPushTests.author
+        )
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.follow_feed_posts(), [post])
+
+    def test_author_dropping_below_threshold_is_backfilled(self):
+        """Посты, изданные пока автор был популярным, попадают в ленты"""
+        Follow.objects.create(
+            user=FollowFeedPushTests.user, author=FollowFeedPushTests.popular
+        )
+        post = Post.objects.create(
+            text='Популярный пост', author=FollowFeedPushTests.popular
+        )
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(
+            user=FollowFeedPushTests.fan, author=FollowFeedPushTests.popular
+        ).delete()
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FollowFeedPushTests.user, post=post
+        ).exists())
+        self.assertEqual(self.follow_feed_posts(), [post])
+
+
+class CommentsViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='User')
+        cls.post = Post.objects.create(text='Текст поста', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': CommentsViewTests.post.pk}
+        )
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for number in range(start, start + count):
+            Comment.objects.create(
+                post=CommentsViewTests.post,
+                author=User.objects.create(username=f'Commenter{number}'),
+                text=f'Комментарий {number}'
             )
-            + '?page=2'
+
+    def test_comments_query_budget(self):
+        """Число запросов post_detail не зависит от числа комментариев"""
+        self.add_comments(3)
+        with self.assertNumQueries(COMMENTS_QUERY_BUDGET):
+            self.guest_client.get(self.url)
+        self.add_comments(40)
+        cache.clear()
+        with self.assertNumQueries(COMMENTS_QUERY_BUDGET):
+            self.guest_client.get(self.url)
+
+    def test_comments_pages(self):
+        """Комментарии выводятся страницами от новых к старым"""
+        self.add_comments(25)
+        response = self.guest_client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'Комментарий 24')
+
+        response = self.guest_client.get(
+            self.url, {'comments': comments.next_cursor}
         )
-        self.assertEqual(len(response.context['page_obj']), 5)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertFalse(comments.has_next())
+        self.assertEqual(comments[4].text, 'Комментарий 0')
+
+
+class ConditionalGetTests(SharedCacheMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='User')
+        cls.author = User.objects.create(username='Author')
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.user)
+
+    def assert_not_modified(self, client, url):
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_unchanged_pages_not_modified(self):
+        """Неизменившиеся страницы отдают 304 без рендеринга"""
+        post = ConditionalGetTests.post
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for url in urls:
+            for client in (self.guest_client, self.authorized_client):
+                with self.subTest(url=url):
+                    etag = client.get(url)['ETag']
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertFalse(response.content)
+
+    def test_etag_depends_on_user(self):
+        """Гость и пользователь получают разные ETag"""
+        url = reverse('posts:index')
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'],
+            self.authorized_client.get(url)['ETag']
+        )
+
+    def test_relogin_invalidates_form_etag(self):
+        """После нового входа страница с формой не отдает 304"""
+        User.objects.create_user(username='Reader', password='password')
+        credentials = {'username': 'Reader', 'password': 'password'}
+        client = Client()
+        client.post(reverse('users:login'), credentials)
+        detail = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': ConditionalGetTests.post.pk}
+        )
+        etag = self.assert_not_modified(client, detail)
+        client.get(reverse('users:logout'))
+        client.post(reverse('users:login'), credentials)
+        response = client.get(detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_invalidate_etag(self):
+        """Новые посты, комментарии и подписки меняют ETag"""
+        post = ConditionalGetTests.post
+        index = reverse('posts:index')
+        group = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        profile = reverse('posts:profile', kwargs={'username': 'Author'})
+        detail = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        etags = {
+            url: self.assert_not_modified(self.authorized_client, url)
+            for url in (index, group, profile, detail)
+        }
+        Post.objects.create(
+            text='Новый пост',
+            author=ConditionalGetTests.author,
+            group=ConditionalGetTests.group
+        )
+        for url in (index, group, profile, detail):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+        etag = self.assert_not_modified(self.authorized_client, detail)
+        Comment.objects.create(
+            post=post, author=ConditionalGetTests.user, text='Комментарий'
+        )
+        response = self.authorized_client.get(
+            detail, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+        etag = self.assert_not_modified(self.authorized_client, profile)
+        Follow.objects.create(
+            user=ConditionalGetTests.user, author=ConditionalGetTests.author
+        )
+        response = self.authorized_client.get(
+            profile, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_etag_without_shared_cache(self):
+        """С кешем в памяти процесса ETag не отдается"""
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        with self.settings(CACHES=locmem):
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_missing_objects_still_404(self):
+        """Без объекта страница по-прежнему отдает 404"""
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_detail', kwargs={'post_id': 10 ** 6}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+
+
+class WriteTransactionTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='User')
+        self.client.force_login(self.user)
+        self.in_transaction = []
+        for model in (Post, Comment):
+            post_save.connect(self.record, sender=model)
+            self.addCleanup(post_save.disconnect, self.record, sender=model)
+
+    def record(self, sender, **kwargs):
+        self.in_transaction.append(connection.in_atomic_block)
+
+    def test_writes_with_signals_in_transaction(self):
+        """
+        Вью записи сохраняют объект и записи обработчиков сигналов
+        в одной транзакции, под блокировкой писателя
+        """
+        self.client.post(reverse('posts:post_create'), {'text': 'Пост'})
+        post = Post.objects.get()
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)), {'text': 'Правка'}
+        )
+        self.client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(self.in_transaction, [True, True, True])
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class SharedCacheMixin:
+    """
+    Кеш, общий для процессов (SQLiteCache во временном каталоге),
+    на время тестов класса: ETag страниц и LRU подписок работают
+    только с ним (posts.cache.is_shared_cache). Каталог создается
+    и удаляется вместе с классом, а не при импорте модуля.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_root = tempfile.mkdtemp(prefix='yatube-cache-')
+        cls._shared_cache = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'core.cache_backends.SQLiteCache',
+                'LOCATION': os.path.join(cls.cache_root, 'cache.sqlite3'),
+            },
+        })
+        cls._shared_cache.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls._remove_shared_cache()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls._remove_shared_cache()
+
+    @classmethod
+    def _remove_shared_cache(cls):
+        cls._shared_cache.disable()
+        shutil.rmtree(cls.cache_root, ignore_errors=True)
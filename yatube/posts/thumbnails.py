@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.images import ImageFile
+
+from core.metrics import untracked
+from .cache import invalidate_post
+from .models import Post
+
+# Хранилище картинок постов; миниатюры строятся по файлу именно в нем,
+# иначе ключи sorl не совпадут с ключами для поля модели
+image_storage = Post._meta.get_field('image').storage
+
+logger = logging.getLogger(__name__)
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    """Бекенд sorl, умеющий искать готовую миниатюру без ее создания"""
+
+    def lookup(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        # Те же умолчания, что и в ThumbnailBackend.get_thumbnail,
+        # иначе имя файла миниатюры не совпадет
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = PostThumbnailBackend()
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POST_THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def generate_thumbnails(name, post_id=None):
+    """
+    Создает миниатюры всех размеров из POST_THUMBNAILS и сбрасывает
+    кеш страниц поста, который мог запомнить исходное изображение.
+    """
+    try:
+        for alias in settings.POST_THUMBNAILS.values():
+            options = dict(alias)
+            geometry = options.pop('geometry')
+            backend.get_thumbnail(
+                ImageFile(name, image_storage), geometry, **options
+            )
+        post = Post.objects.filter(pk=post_id).first() if post_id else None
+        if post is not None:
+            invalidate_post(post)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _pending_lock:
+            _pending.discard(name)
+        if settings.POST_THUMBNAIL_WORKERS:
+            connections.close_all()
+
+
+def _submit(name, post_id):
+    with _pending_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if settings.POST_THUMBNAIL_WORKERS:
+        _get_executor().submit(generate_thumbnails, name, post_id)
+    else:
+        with untracked():
+            generate_thumbnails(name, post_id)
+
+
+def _is_fresh(path, grace):
+    return time.time() - os.path.getmtime(path) < grace
+
+
+def collect_image(name, grace=None):
+    """
+    Удаляет картинку и ее миниатюры, если на файл не ссылается ни один
+    пост. Повторная загрузка тех же байт не пишет файл, а только
+    обновляет его mtime (ContentAddressedStorage.save), и ее пост
+    сохраняется позже. Поэтому файл моложе grace секунд не удаляется,
+    а перед удалением переименовывается: загрузка после этого запишет
+    файл заново, а тронувшая его раньше видна по mtime при повторной
+    проверке. Возвращает True, если картинка удалена.
+    """
+    if grace is None:
+        grace = settings.POST_IMAGE_GC_GRACE
+    if Post.objects.filter(image=name).exists():
+        return False
+    path = image_storage.path(name)
+    trash = f'{path}.{uuid.uuid4().hex}.deleted'
+    try:
+        if _is_fresh(path, grace):
+            return False
+        os.rename(path, trash)
+    except FileNotFoundError:
+        return False
+    if _is_fresh(trash, grace) or Post.objects.filter(image=name).exists():
+        os.replace(trash, path)
+        return False
+    os.remove(trash)
+    if not os.path.exists(path):
+        default.kvstore.delete(ImageFile(name, image_storage))
+    return True
+
+
+def sweep_images(grace=None):
+    """
+    Удаляет картинки постов без ссылок, пропущенные при удалении
+    постов из-за grace (см. collect_image). Возвращает их число.
+    """
+    directory = Post._meta.get_field('image').upload_to
+    removed = 0
+    if not image_storage.exists(directory):
+        return removed
+    for shard in image_storage.listdir(directory)[0]:
+        names = [
+            os.path.join(directory, shard, filename)
+            for filename in image_storage.listdir(
+                os.path.join(directory, shard)
+            )[1]
+            if not filename.endswith(('.tmp', '.deleted'))
+        ]
+        used = set(
+            Post.objects.filter(image__in=names).values_list(
+                'image', flat=True
+            )
+        )
+        for name in names:
+            if name not in used and collect_image(name, grace):
+                removed += 1
+    return removed
+
+
+def _release(name):
+    try:
+        collect_image(name)
+    except Exception:
+        logger.exception('Не удалось удалить картинку %s', name)
+
+
+def release_image(name):
+    """
+    После коммита удаляет картинку и ее миниатюры, если на файл
+    больше не ссылается ни один пост (см. collect_image).
+    """
+    if name:
+        transaction.on_commit(lambda: _release(name))
+
+
+def schedule_thumbnails(name, post_id=None):
+    """Ставит создание миниатюр в очередь пула после коммита транзакции"""
+    if name:
+        transaction.on_commit(lambda: _submit(name, post_id))
+
+
+def get_thumbnail(image, alias):
+    """
+    Возвращает готовую миниатюру. Если ее еще нет, ставит создание
+    в очередь и возвращает исходное изображение.
+    """
+    if not image:
+        return None
+    options = dict(settings.POST_THUMBNAILS[alias])
+    geometry = options.pop('geometry')
+    thumbnail = backend.lookup(image, geometry, **options)
+    if thumbnail is None:
+        schedule_thumbnails(image.name)
+        return image
+    return thumbnail
@@ -0,0 +1,355 @@
+import csv
+import json
+import multiprocessing
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from .feeds import is_push_mode, rebuild_follow_feeds
+from .models import Post, Group, Comment, Follow
+from .popular import refresh_scores
+from .search import rebuild_index
+from .stats import rebuild_follow_counts, rebuild_post_counts
+
+User = get_user_model()
+
+JSONL = 'jsonl'
+CSV = 'csv'
+FORMATS = (JSONL, CSV)
+POST = 'post'
+COMMENT = 'comment'
+FOLLOW = 'follow'
+KINDS = (POST, COMMENT, FOLLOW)
+# Колонки CSV: общие для всех типов записей, лишние остаются пустыми
+CSV_FIELDS = (
+    'type', 'id', 'post', 'user', 'author', 'group', 'text', 'date',
+    'image', 'image_width', 'image_height', 'image_size',
+)
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+# Даты auto_now_add, которые при переносе берутся из выгрузки
+DATE_FIELDS = {POST: 'pub_date', COMMENT: 'created'}
+# Поля, по которым пост или комментарий узнается как уже загруженный
+IDENTITY = {
+    POST: ('author_id', 'pub_date'),
+    COMMENT: ('post_id', 'author_id', 'created'),
+}
+
+
+def export_records(chunk_size=CHUNK_SIZE):
+    """
+    Посты, затем комментарии, затем подписки. Авторы и группы
+    записываются по username и slug, строки читаются итератором.
+    """
+    posts = Post.objects.order_by('pk').values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date',
+        'image', 'image_width', 'image_height', 'image_size'
+    )
+    for (pk, author, group, text, pub_date, image, width, height,
+         size) in posts.iterator(chunk_size=chunk_size):
+        yield {
+            'type': POST, 'id': pk, 'author': author, 'group': group,
+            'text': text, 'date': pub_date.isoformat(), 'image': image,
+            'image_width': width, 'image_height': height,
+            'image_size': size,
+        }
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created'
+    )
+    for pk, post_id, author, text, created in comments.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'type': COMMENT, 'id': pk, 'post': post_id, 'author': author,
+            'text': text, 'date': created.isoformat(),
+        }
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username'
+    )
+    for user, author in follows.iterator(chunk_size=chunk_size):
+        yield {'type': FOLLOW, 'user': user, 'author': author}
+
+
+def write_records(records, output, file_format=JSONL):
+    """Записывает записи в открытый текстовый файл, возвращает их число"""
+    count = 0
+    if file_format == CSV:
+        writer = csv.DictWriter(output, CSV_FIELDS)
+        writer.writeheader()
+    for record in records:
+        if file_format == CSV:
+            writer.writerow(record)
+        else:
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def read_records(source, file_format=JSONL):
+    """Читает записи из открытого текстового файла по одной"""
+    if file_format == CSV:
+        for row in csv.DictReader(source):
+            yield {key: value or None for key, value in row.items()}
+        return
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _number(value):
+    return None if value in (None, '') else int(value)
+
+
+# Словари username -> id и slug -> id. Заполняются до запуска
+# процессов, и те получают их при fork без передачи через pickle.
+_users = {}
+_groups = {}
+
+
+def load_lookups():
+    _users.clear()
+    _users.update(User.objects.values_list('username', 'pk').iterator())
+    _groups.clear()
+    _groups.update(Group.objects.values_list('slug', 'pk').iterator())
+
+
+def _build(kind, record, posts):
+    """Объект модели для записи или None, если ее не к чему привязать"""
+    author_id = _users.get(record.get('author'))
+    if author_id is None:
+        return None
+    # Посты и комментарии сохраняются со своими id
+    pk = _number(record.get('id'))
+    if kind in DATE_FIELDS and pk is None:
+        return None
+    if kind == POST:
+        group = record.get('group')
+        if group and group not in _groups:
+            return None
+        return Post(
+            pk=pk, author_id=author_id,
+            group_id=_groups.get(group), text=record['text'],
+            pub_date=parse_datetime(record['date']),
+            image=record.get('image') or '',
+            image_width=_number(record.get('image_width')),
+            image_height=_number(record.get('image_height')),
+            image_size=_number(record.get('image_size')),
+        )
+    if kind == COMMENT:
+        post_id = posts.get(_number(record['post']))
+        if post_id is None:
+            return None
+        return Comment(
+            pk=pk, post_id=post_id,
+            author_id=author_id, text=record['text'],
+            created=parse_datetime(record['date']),
+        )
+    user_id = _users.get(record.get('user'))
+    if user_id is None or user_id == author_id:
+        return None
+    return Follow(user_id=user_id, author_id=author_id)
+
+
+def _split(kind, objects):
+    """
+    Делит посты или комментарии на новые и уже загруженные. Запись
+    с теми же полями IDENTITY уже загружена прошлым импортом. Новая
+    запись сохраняется со своим id, а если id занят другой строкой -
+    с новым id.
+    Возвращает (записи со своим id, записи для новых id,
+    {исходный id: id в базе} для своих и уже загруженных).
+    """
+    model = type(objects[0])
+    fields = IDENTITY[kind]
+    loaded = {
+        tuple(row[1:]): row[0]
+        for row in model.objects.filter(**{
+            f'{field}__in': {getattr(obj, field) for obj in objects}
+            for field in fields
+        }).values_list('pk', *fields)
+    }
+    taken = set(
+        model.objects.filter(
+            pk__in=[obj.pk for obj in objects]
+        ).values_list('pk', flat=True)
+    )
+    new = []
+    moved = []
+    ids = {}
+    for obj in objects:
+        pk = loaded.get(tuple(getattr(obj, field) for field in fields))
+        if pk is not None:
+            ids[obj.pk] = pk
+        elif obj.pk in taken:
+            moved.append(obj)
+        else:
+            new.append(obj)
+            ids[obj.pk] = obj.pk
+    return new, moved, ids
+
+
+def _new_follows(follows):
+    existing = set(
+        Follow.objects.filter(
+            user_id__in={follow.user_id for follow in follows},
+            author_id__in={follow.author_id for follow in follows}
+        ).values_list('user_id', 'author_id')
+    )
+    return [
+        follow for follow in follows
+        if (follow.user_id, follow.author_id) not in existing
+    ]
+
+
+def _save_moved(objects, ids):
+    """
+    Сохраняет записи, чей id занят, с id от базы. bulk_create не
+    возвращает id в SQLite, поэтому записи сохраняются по одной;
+    raw не вызывает pre_save полей и обработчики сигналов.
+    """
+    with transaction.atomic():
+        for obj in objects:
+            source = obj.pk
+            obj.pk = None
+            obj.save_base(raw=True)
+            ids[source] = obj.pk
+
+
+def _save(kind, objects):
+    """
+    bulk_create заменяет даты auto_now_add текущим временем в pre_save
+    поля, поэтому исходные даты записываются отдельным bulk_update,
+    который pre_save не вызывает
+    """
+    model = type(objects[0])
+    field = DATE_FIELDS.get(kind)
+    dates = [getattr(obj, field) for obj in objects] if field else None
+    with transaction.atomic():
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        if field:
+            for obj, date in zip(objects, dates):
+                setattr(obj, field, date)
+            model.objects.bulk_update(objects, [field])
+
+
+def import_batch(kind, records, posts=None):
+    """
+    Сохраняет пачку записей одного типа. Строки, которые уже есть
+    в базе, пропускаются, поэтому импорт можно повторить после сбоя.
+    Пост или комментарий, чей id занят, получает новый id. Комментарии
+    привязываются к постам через posts - {исходный id поста: id
+    в базе}; комментарии к незагруженным постам пропускаются.
+    Возвращает (сохранено, пропущено, {исходный id поста: id в базе}).
+    """
+    objects = [_build(kind, record, posts or {}) for record in records]
+    objects = [obj for obj in objects if obj is not None]
+    ids = {}
+    moved = []
+    if kind in IDENTITY and objects:
+        objects, moved, ids = _split(kind, objects)
+    elif objects:
+        objects = _new_follows(objects)
+    if objects:
+        _save(kind, objects)
+    if moved:
+        _save_moved(moved, ids)
+    saved = len(objects) + len(moved)
+    # Родителю нужны только id постов: по ним привязываются комментарии
+    return saved, len(records) - saved, ids if kind == POST else {}
+
+
+def _batches(records, batch_size):
+    """Пачки подряд идущих записей одного типа"""
+    batch = []
+    kind = None
+    for record in records:
+        if record['type'] not in KINDS:
+            raise ValueError(f"Неизвестный тип записи {record['type']!r}")
+        if batch and (record['type'] != kind or len(batch) >= batch_size):
+            yield kind, batch
+            batch = []
+        kind = record['type']
+        batch.append(record)
+    if batch:
+        yield kind, batch
+
+
+def _batch_posts(kind, batch, posts):
+    """Часть словаря постов, нужная пачке комментариев"""
+    if kind != COMMENT:
+        return None
+    return {
+        source: posts[source]
+        for source in {_number(record['post']) for record in batch}
+        if source in posts
+    }
+
+
+def import_records(records, batch_size=BATCH_SIZE, workers=1):
+    """
+    Загружает записи пачками через bulk_create. С workers > 1 пачки
+    сохраняются в параллельных процессах; записи следующего типа
+    начинают сохраняться только после всех записей предыдущего,
+    иначе комментарий может опередить свой пост.
+    Возвращает словарь {тип: [сохранено, пропущено]}.
+    """
+    load_lookups()
+    stats = {kind: [0, 0] for kind in KINDS}
+    # Исходный id поста -> id в базе; по нему привязываются комментарии
+    posts = {}
+
+    def count(kind, result):
+        stats[kind][0] += result[0]
+        stats[kind][1] += result[1]
+        posts.update(result[2])
+
+    if workers <= 1:
+        for kind, batch in _batches(records, batch_size):
+            count(kind, import_batch(
+                kind, batch, _batch_posts(kind, batch, posts)
+            ))
+    else:
+        # Дочерние процессы не должны делить соединения с родителем
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers) as pool:
+            pending = []
+            for kind, batch in _batches(records, batch_size):
+                if pending and pending[0][0] != kind:
+                    for previous, result in pending:
+                        count(previous, result.get())
+                    pending = []
+                pending.append((kind, pool.apply_async(
+                    import_batch,
+                    (kind, batch, _batch_posts(kind, batch, posts))
+                )))
+                # Не читаем файл дальше, чем успевают процессы
+                if len(pending) >= workers * 2:
+                    previous, result = pending.pop(0)
+                    count(previous, result.get())
+            for previous, result in pending:
+                count(previous, result.get())
+    return stats
+
+
+def finish_import():
+    """
+    bulk_create не вызывает сигналы, поэтому производные данные
+    пересчитываются целиком после загрузки.
+    """
+    rebuild_index()
+    rebuild_post_counts()
+    rebuild_follow_counts()
+    refresh_scores()
+    if is_push_mode():
+        rebuild_follow_feeds()
+    # Посты и комментарии сохранены с явными id
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment]
+        ):
+            cursor.execute(sql)
+    cache.clear()
@@ -1,78 +1,218 @@
+import os
+
+from django.conf import settings
 from django.shortcuts import (
     render, get_object_or_404, redirect
 )
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.views.decorators.http import condition
 
 from .models import Post, Group, Follow
+from .cache import (
+    INDEX, GROUP, PROFILE, POST, FOLLOWING, FOLLOWERS, POPULAR, feed_cache,
+    page_etag
+)
+from .feeds import follow_feed
 from .forms import PostForm, CommentForm
+from .graph import is_following
+from .search import SearchResults
+from .sitemaps import INDEX_NAME, SHARD_NAME
+from .syndication import feed_response
+from .stats import get_post_count, get_user_stats
 from core.utils import paginate
 
 
 User = get_user_model()
 
+COMMENTS_PER_PAGE = 20
+SEARCH_PER_PAGE = 10
+POPULAR_ORDERING = ('score', 'pk')
+FOLLOW_ORDERING = ('created', 'pk')
+
+
+def index_etag(request):
+    return page_etag(request, (INDEX,))
+
+
+def popular_etag(request):
+    return page_etag(request, (POPULAR,))
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return page_etag(request, (GROUP, group_id))
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    # Кнопка подписки зависит от подписок того, кто смотрит,
+    # счетчики - от подписок и подписчиков автора
+    return page_etag(
+        request, (PROFILE, author_id), (FOLLOWING, request.user.pk),
+        (FOLLOWING, author_id), (FOLLOWERS, author_id)
+    )
+
+
+def post_etag(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    # На странице поста есть счетчик публикаций автора и форма
+    # комментария с CSRF-токеном
+    return page_etag(
+        request, (POST, post_id), (PROFILE, author_id), csrf=True
+    )
 
+
+@condition(etag_func=index_etag)
 def index(request):
     """Вью для отображения главной страницы с публикациями"""
     template: str = 'posts/index.html'
     post_list = Post.objects.select_related('author').select_related('group').all()
-    page_number = request.GET.get('page')
-    page_obj = paginate(post_list, page_number)
+    page_obj = paginate(post_list, request.GET.get('cursor'))
 
     context: dict = {
         'page_obj': page_obj,
+        **feed_cache(INDEX),
     }
     return render(request, template, context)
 
 
+@condition(etag_func=popular_etag)
+def popular(request):
+    """
+    Посты по рейтингу из posts.popular. Рейтинг хранится в индексе,
+    поэтому страница стоит столько же, сколько главная.
+    """
+    template = 'posts/popular.html'
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = paginate(
+        post_list, request.GET.get('cursor'), ordering=POPULAR_ORDERING
+    )
+    context = {
+        'page_obj': page_obj,
+        **feed_cache(POPULAR),
+    }
+    return render(request, template, context)
+
+
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     """Вью для отображения страниц с постами конкретной группы"""
     template: str = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author').all()
-    page_number = request.GET.get('page')
-    page_obj = paginate(post_list, page_number)
+    page_obj = paginate(post_list, request.GET.get('cursor'))
 
     context: dict = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache(GROUP, group.pk),
     }
     return render(request, template, context)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
-    post_list = author.posts.all()
-    post_count = post_list.count()
-    page_number = request.GET.get('page')
-    page_obj = paginate(post_list, page_number)
+    following = is_following(request.user, author.pk)
+    post_list = author.posts.select_related('group').all()
+    stats = get_user_stats(author.pk)
+    page_obj = paginate(
+        post_list, request.GET.get('cursor'), total=stats['post_count']
+    )
 
     context = {
         'author': author,
         'page_obj': page_obj,
-        'post_count': post_count,
+        'post_count': stats['post_count'],
+        'follower_count': stats['follower_count'],
+        'following_count': stats['following_count'],
         'following': following,
+        **feed_cache(PROFILE, author.pk),
     }
     return render(request, template, context)
 
 
+def index_feed(request, feed_format):
+    """RSS или Atom с последними постами сайта"""
+    return feed_response(request, feed_format, INDEX)
+
+
+def group_feed(request, slug, feed_format):
+    return feed_response(request, feed_format, GROUP, slug)
+
+
+def profile_feed(request, username, feed_format):
+    return feed_response(request, feed_format, PROFILE, username)
+
+
+def sitemap(request, name=INDEX_NAME):
+    """Файлы карты сайта, созданные командой generate_sitemaps"""
+    if name != INDEX_NAME and not SHARD_NAME.fullmatch(name):
+        raise Http404
+    path = os.path.join(settings.SITEMAP_ROOT, name)
+    if not os.path.exists(path):
+        raise Http404
+    if name == INDEX_NAME:
+        return FileResponse(open(path, 'rb'), content_type='application/xml')
+    return FileResponse(open(path, 'rb'), content_type='application/gzip')
+
+
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
     form = CommentForm()
-    post_count = post.author.posts.count()
+    post_count = get_post_count(post.author_id)
+    comments = paginate(
+        post.comments.select_related('author'),
+        request.GET.get('comments'),
+        COMMENTS_PER_PAGE,
+        ordering=('created', 'pk')
+    )
     context = {
         'post': post,
         'post_count': post_count,
         'form': form,
+        'comments': comments,
+        **feed_cache(POST, post.pk),
     }
     return render(request, template, context)
 
 
+def search(request):
+    """Вью поиска по тексту постов и названиям групп"""
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = Paginator(SearchResults(query), SEARCH_PER_PAGE).get_page(
+            request.GET.get('page')
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -82,7 +222,10 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # Пост и записи обработчиков сигналов - одна транзакция
+        # одного писателя (core.db.sqlite3)
+        with transaction.atomic():
+            post.save()
         return redirect(f'/profile/{post.author}/')
     return render(request, 'posts/create_post.html', {
         'form': form,
@@ -106,7 +249,8 @@ def post_edit(request, post_id):
         'post': post,
     }
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', context)
 
@@ -119,18 +263,18 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    following_list = Follow.objects.values_list('author').filter(
-        user=request.user
+    post_list, ordering = follow_feed(request.user)
+    post_list = post_list.select_related('author', 'group')
+    page_obj = paginate(
+        post_list, request.GET.get('cursor'), ordering=ordering
     )
-    post_list = Post.objects.filter(author__in=following_list)
-    page_number = request.GET.get('page')
-    page_obj = paginate(post_list, page_number)
     context = {
         'page_obj': page_obj
     }
@@ -147,7 +291,37 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = User.objects.get(username=username)
-    follow = Follow.objects.get(user=request.user, author=author)
-    follow.delete()
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
+
+
+def follow_list(request, username, relation):
+    """
+    Подписчики (relation='user') или подписки (relation='author')
+    пользователя, новые сверху
+    """
+    author = get_object_or_404(User, username=username)
+    if relation == 'user':
+        follows = Follow.objects.filter(author=author)
+    else:
+        follows = Follow.objects.filter(user=author)
+    page_obj = paginate(
+        follows.select_related(relation), request.GET.get('cursor'),
+        ordering=FOLLOW_ORDERING
+    )
+    context = {
+        'author': author,
+        'page_obj': page_obj,
+        'people': [getattr(follow, relation) for follow in page_obj],
+        'followers': relation == 'user',
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def followers(request, username):
+    return follow_list(request, username, 'user')
+
+
+def following(request, username):
+    return follow_list(request, username, 'author')
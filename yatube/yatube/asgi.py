@@ -0,0 +1,23 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no native ASGI support, so the WSGI application is served
+through core.asgi.WSGIToASGI with a pool of ASGI_THREADS threads.
+Views stay synchronous: the independent reads of a page (for example
+the follow check and the counters in profile) run one after another
+in the worker thread, not concurrently.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIToASGI
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WSGIToASGI(
+    get_wsgi_application(), workers=settings.ASGI_THREADS
+)
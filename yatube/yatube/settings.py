@@ -36,11 +36,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     #'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,16 +74,45 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Потоки, в которых yatube.asgi выполняет вью; соединений с базой
+# открывается не больше, чем потоков.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 8))
 
 # Database
 
+# core.db.sqlite3 - sqlite3 с WAL, прагмами и очередью писателей.
+# OPTIONS['timeout'] - сколько секунд писатель ждет своей очереди,
+# OPTIONS['pragmas'] дополняет core.db.sqlite3.base.PRAGMAS.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
+# Реплики только для чтения: пути к копиям базы через запятую
+# (например, litestream). Чтение идет в реплики через ReplicaRouter,
+# запись и чтение сразу после записи - в default.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из default:
+# верхняя граница отставания реплик.
+REPLICA_PIN_SECONDS = 5
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -130,8 +162,154 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-CACHES = {
-    'default': {
+# Кеш выбирается переменной окружения YATUBE_CACHE_BACKEND:
+# locmem - свой у каждого процесса, file и sqlite - общие для всех
+# процессов (воркеров gunicorn) на одном хосте.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('YATUBE_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('YATUBE_CACHE_MAX_ENTRIES', 10000)),
+            'MAX_SIZE': int(
+                os.getenv('YATUBE_CACHE_MAX_SIZE', 64 * 1024 * 1024)
+            ),
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('YATUBE_CACHE_BACKEND', 'locmem')],
+}
+
+# Лента подписок: 'pull' - собирается при чтении,
+# 'push' - раскладывается по подписчикам при публикации (fan-out).
+FOLLOW_FEED_MODE = 'pull'
+# Посты авторов, у которых подписчиков больше порога,
+# не рассылаются и в режиме 'push' читаются при запросе.
+FOLLOW_FEED_PUSH_THRESHOLD = 1000
+# Сколько наборов подписок пользователей держит каждый процесс
+# (posts.graph); по ним проверяется подписка на странице профиля.
+# Работает только с общим кешем (file, sqlite): с locmem подписка
+# в другом воркере не сбросила бы набор, и он читается из базы.
+FOLLOWING_CACHE_SIZE = 10000
+
+# Время жизни фрагментов лент: они сбрасываются сигналами
+# при изменении постов и комментариев, поэтому TTL может быть большим.
+FEED_CACHE_TIMEOUT = 60 * 60
+# Лента популярного (posts.popular): вклад поста и комментариев
+# удваивается каждые POPULAR_HALF_LIFE_HOURS часов, то есть пост
+# на столько часов старше должен собрать вдвое больше обсуждения.
+POPULAR_HALF_LIFE_HOURS = 12
+POPULAR_COMMENT_WEIGHT = 1.0
+POPULAR_FOLLOWER_WEIGHT = 0.5
+# Число постов в лентах RSS и Atom
+SYNDICATION_ITEMS = 20
+# Карта сайта (команда generate_sitemaps): каталог с файлами, адрес
+# сайта для ссылок и число адресов в шарде (не больше 50 000)
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_BASE_URL = os.getenv('YATUBE_SITE_URL', 'http://localhost:8000')
+SITEMAP_SHARD_SIZE = 50000
+# Входит в ETag страниц: после выкладки новых шаблонов браузеры
+# получат новые страницы, а не 304 Not Modified.
+ETAG_RELEASE = os.getenv('YATUBE_RELEASE', '')
+
+# Загружаемые картинки постов уменьшаются до POST_IMAGE_MAX_SIZE по
+# большей стороне и перекодируются без метаданных (posts.images).
+POST_IMAGE_MAX_SIZE = 1920
+POST_IMAGE_FORMAT = 'WEBP'
+POST_IMAGE_QUALITY = 82
+# Ограничения на исходный файл, байты и пиксели
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+# Картинка без ссылок удаляется, только если ее файл не трогали столько
+# секунд: повторная загрузка тех же байт обновляет mtime, а пост с ней
+# сохраняется позже. Остальное удаляет manage.py sweep_post_images.
+POST_IMAGE_GC_GRACE = 60 * 60
+
+# Размеры миниатюр картинок постов. Все они создаются в фоне сразу после
+# сохранения картинки, шаблоны только читают готовые миниатюры.
+POST_THUMBNAILS = {
+    'index': {'geometry': '960x339', 'crop': 'top', 'upscale': True},
+    'card': {'geometry': '960x339', 'crop': 'center', 'upscale': True},
+}
+# Потоки для создания миниатюр; 0 - создавать синхронно.
+POST_THUMBNAIL_WORKERS = int(os.getenv('YATUBE_THUMBNAIL_WORKERS', 2))
+
+# Бюджеты SQL-запросов вью для core.middleware.MetricsMiddleware.
+# Превышение при QUERY_BUDGET_STRICT - исключение (так в тестах, см.
+# settings_test), иначе - предупреждение в логе.
+# В бюджеты лент заложено до 10 чтений миниатюр из kvstore sorl
+# при холодном кеше и первое создание счетчика публикаций автора,
+# в бюджеты подписки - первое создание счетчиков обоих пользователей,
+# в бюджеты записи - BEGIN IMMEDIATE транзакции писателя (в тестах
+# вместо него SAVEPOINT и RELEASE).
+QUERY_BUDGETS = {
+    'posts:index': 16,
+    'posts:popular': 16,
+    'posts:group_list': 18,
+    'posts:profile': 20,
+    'posts:follow_index': 16,
+    'posts:followers': 10,
+    'posts:following': 10,
+    'posts:search': 18,
+    'posts:post_detail': 10,
+    'posts:post_create': 14,
+    'posts:post_edit': 14,
+    'posts:add_comment': 8,
+    'posts:profile_follow': 20,
+    'posts:profile_unfollow': 20,
+    'posts:index_feed': 3,
+    'posts:group_feed': 4,
+    'posts:profile_feed': 4,
+    'api:posts': 4,
+    'api:post_detail': 4,
+    'api:comments': 5,
+    'api:groups': 4,
+    'api:group_posts': 5,
+    'api:user_posts': 5,
+    'api:follow_posts': 6,
+    'api:follows': 5,
+}
+QUERY_BUDGET_STRICT = os.getenv('YATUBE_QUERY_BUDGET_STRICT') == '1'
+# Время рендеринга шаблонов в логе запросов и на /metrics (template_ms).
+# Замер подменяет Template.render, поэтому по умолчанию выключен.
+TEMPLATE_TIMING = os.getenv('YATUBE_TEMPLATE_TIMING') == '1'
+# Время каждого шаблона и include на /metrics и в profile_templates.
+# Перехват каждого рендеринга стоит времени, поэтому по умолчанию выключен.
+TEMPLATE_PROFILING = os.getenv('YATUBE_TEMPLATE_PROFILING') == '1'
+# /metrics отвечает только на запросы с адресов из METRICS_IPS
+# с заголовком "Authorization: Bearer <METRICS_TOKEN>";
+# без токена эндпоинт выключен.
+METRICS_IPS = ['127.0.0.1']
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN', '')
+
+# Строки с метриками каждого запроса (view, status, queries, sql_ms ...)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('YATUBE_REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
@@ -0,0 +1,44 @@
+"""
+Production settings for yatube project.
+
+Usage: DJANGO_SETTINGS_MODULE=yatube.settings_production
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHE_BACKENDS, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ['YATUBE_SECRET_KEY']
+
+# Имена хостов через запятую
+ALLOWED_HOSTS = os.getenv(
+    'YATUBE_ALLOWED_HOSTS',
+    'www.bogachevmikhail.pythonanywhere.com,'
+    'bogachevmikhail.pythonanywhere.com'
+).split(',')
+
+# Общий для всех воркеров кеш: версии лент и ETag страниц должны
+# меняться во всех процессах сразу, а не только в том, где была правка.
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('YATUBE_CACHE_BACKEND', 'sqlite')],
+}
+
+# Шаблоны компилируются один раз на процесс и хранятся в памяти.
+# Django делает так и сам при DEBUG = False, здесь это задано явно,
+# чтобы профиль не зависел от умолчаний.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
@@ -0,0 +1,26 @@
+"""
+Test settings for yatube project.
+
+Usage: python manage.py test --settings=yatube.settings_test
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import LOGGING
+
+# Пул миниатюр не нужен: его потоки переживают временный MEDIA_ROOT
+POST_THUMBNAIL_WORKERS = 0
+
+# Превышение бюджета SQL-запросов роняет тест
+QUERY_BUDGET_STRICT = True
+
+# Строки с метриками каждого запроса не засоряют вывод тестов
+LOGGING = {
+    **LOGGING,
+    'loggers': {
+        **LOGGING['loggers'],
+        'yatube.requests': {
+            **LOGGING['loggers']['yatube.requests'],
+            'level': 'WARNING',
+        },
+    },
+}